@@ -0,0 +1,167 @@
+"""
+Трассировка (OpenTelemetry).
+
+Один и тот же модуль лежит в judge_service (app/tracing.py) и
+course_service (app/core/tracing.py) — у сервисов раздельные образы.
+
+- HTTP-запросы FastAPI и каждый SQL-запрос SQLAlchemy — спаны
+  из инструментаций OpenTelemetry, свои этапы сервисы размечают через
+  get_tracer(__name__).
+- Контекст берётся из traceparent, а если его нет — из X-Request-Id
+  gateway: trace_id выводится из request id, так что все спаны одного
+  запроса ищутся по rid из access-лога nginx.
+- Экспорт: TRACING_EXPORTER=file (JSON Lines в TRACING_FILE),
+  otlp (коллектор по OTEL_EXPORTER_OTLP_ENDPOINT) или none.
+  Инструментации импортируются только при включённом экспорте —
+  с none они не замедляют старт пода.
+"""
+import hashlib
+import os
+import re
+import threading
+from typing import Optional, Sequence
+
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+from opentelemetry.propagators.composite import CompositePropagator
+from opentelemetry.propagators.textmap import (
+    CarrierT,
+    Getter,
+    Setter,
+    TextMapPropagator,
+    default_getter,
+    default_setter,
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.trace import NonRecordingSpan, SpanContext, TraceFlags
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+from sqlalchemy.engine import Engine
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none")
+TRACING_FILE = os.getenv("TRACING_FILE", "/tmp/traces.jsonl")
+
+REQUEST_ID_HEADER = "x-request-id"
+
+_HEX_TRACE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+_provider: Optional[TracerProvider] = None
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Пишет завершённые спаны в файл, по одному JSON на строку.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        with self._lock:
+            for span in spans:
+                self._file.write(span.to_json(indent=None))
+                self._file.write("\n")
+            self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class RequestIdPropagator(TextMapPropagator):
+    """
+    Родительский контекст из X-Request-Id, когда traceparent нет.
+
+    nginx генерирует $request_id как 32 hex-символа — это и есть
+    trace_id. Request id клиента произвольного вида хэшируется.
+    """
+
+    def extract(
+        self,
+        carrier: CarrierT,
+        context: Optional[Context] = None,
+        getter: Getter = default_getter,
+    ) -> Context:
+        values = getter.get(carrier, REQUEST_ID_HEADER)
+        if not values or not values[0]:
+            return context if context is not None else Context()
+        request_id = values[0].strip().lower()
+        digest = hashlib.sha256(request_id.encode("utf-8")).hexdigest()
+        trace_id = request_id if _HEX_TRACE_ID.match(request_id) else digest[:32]
+        parent = SpanContext(
+            trace_id=int(trace_id, 16),
+            # Спан gateway: nginx его не экспортирует, но он общий для
+            # всех сервисов запроса
+            span_id=int(digest[32:48], 16) or 1,
+            is_remote=True,
+            trace_flags=TraceFlags(TraceFlags.SAMPLED),
+        )
+        return trace.set_span_in_context(NonRecordingSpan(parent), context)
+
+    def inject(
+        self,
+        carrier: CarrierT,
+        context: Optional[Context] = None,
+        setter: Setter = default_setter,
+    ) -> None:
+        # Дальше контекст идёт через traceparent
+        return None
+
+    @property
+    def fields(self) -> set:
+        return {REQUEST_ID_HEADER}
+
+
+def _make_exporter() -> Optional[SpanExporter]:
+    if TRACING_EXPORTER == "file":
+        return FileSpanExporter(TRACING_FILE)
+    if TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+    return None
+
+
+def setup_tracing(app, service_name: str) -> None:
+    """
+    Провайдер спанов и инструментация FastAPI. Вызывать при создании
+    приложения; SQL — отдельно, когда появится движок.
+    """
+    global _provider
+    # traceparent, если есть, перекрывает контекст из X-Request-Id
+    propagate.set_global_textmap(
+        CompositePropagator([RequestIdPropagator(), TraceContextTextMapPropagator()])
+    )
+    exporter = _make_exporter()
+    if exporter is None:
+        return
+    _provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+    FastAPIInstrumentor.instrument_app(app, tracer_provider=_provider)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Спан на каждый SQL-запрос движка.
+    """
+    if _provider is not None:
+        from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
+        SQLAlchemyInstrumentor().instrument(engine=engine, tracer_provider=_provider)
+
+
+def shutdown_tracing() -> None:
+    # Дописывает спаны из буфера BatchSpanProcessor
+    if _provider is not None:
+        _provider.shutdown()
@@ -3,4 +3,7 @@ from .base_class import Base # noqa
 
 # Импорт моделей — важно для create_all
 from app.models.module import Module # noqa
-from app.models.task import Task # noqa
\ No newline at end of file
+from app.models.task import Task # noqa
+from app.models.test_case import TestCase # noqa
+from app.models.module_read import ModuleRead # noqa
+from app.models.progress import UserTaskProgress # noqa
\ No newline at end of file
@@ -0,0 +1,64 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.task import Task
+from app.models.test_case import TestCase
+
+
+def load_test_bundles(db: Session, known: Dict[int, Optional[int]]) -> Dict[str, Any]:
+    """
+    Пакеты тестов для judge_service: known — task_id -> версия, уже
+    известная клиенту. Тесты отдаются только для задач, чья версия
+    изменилась; остальные попадают в unchanged, несуществующие — в missing.
+
+    Сначала читаем версии, потом тесты: если тесты поменяются между
+    запросами, клиент получит новые тесты со старой версией и просто
+    перезапросит их при следующей сверке. Обратный порядок мог бы
+    навсегда закэшировать старые тесты под новой версией.
+    """
+    if not known:
+        return {"bundles": [], "unchanged": [], "missing": []}
+
+    rows = db.execute(
+        select(Task.id, Task.tests_version, Task.language).where(Task.id.in_(list(known)))
+    ).all()
+    found = {row.id: row for row in rows}
+
+    unchanged: List[int] = []
+    changed: Dict[int, Dict[str, Any]] = {}
+    for task_id, row in found.items():
+        if known[task_id] == row.tests_version:
+            unchanged.append(task_id)
+        else:
+            changed[task_id] = {
+                "taskId": task_id,
+                "version": row.tests_version,
+                "language": row.language,
+                "tests": [],
+            }
+
+    if changed:
+        # Чекер (и код custom-чекера) — только для изменившихся задач
+        checkers = db.execute(
+            select(Task.id, Task.checker, Task.checker_epsilon, Task.checker_code)
+            .where(Task.id.in_(list(changed)))
+        )
+        for task_id, kind, epsilon, code in checkers:
+            changed[task_id]["checker"] = {"type": kind, "epsilon": epsilon, "code": code}
+
+        tests = db.execute(
+            select(TestCase.task_id, TestCase.input_data, TestCase.expected_output)
+            .where(TestCase.task_id.in_(list(changed)))
+            .order_by(TestCase.task_id, TestCase.id)
+        )
+        for task_id, input_data, expected_output in tests:
+            # Пара вместо объекта: в msgpack не повторяются имена полей
+            changed[task_id]["tests"].append([input_data, expected_output])
+
+    return {
+        "bundles": list(changed.values()),
+        "unchanged": unchanged,
+        "missing": [task_id for task_id in known if task_id not in found],
+    }
@@ -0,0 +1,203 @@
+import logging
+import os
+import threading
+from typing import Callable, Dict, Set
+
+from sqlalchemy import BigInteger, String, column, select, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.models.module import Module
+from app.models.module_read import ModuleRead
+
+logger = logging.getLogger(__name__)
+
+# Как часто сбрасываем буфер в БД и при каком размере — досрочно
+READ_FLUSH_INTERVAL_SECONDS = float(os.getenv("READ_FLUSH_INTERVAL_SECONDS", "1.0"))
+READ_FLUSH_MAX_PENDING = int(os.getenv("READ_FLUSH_MAX_PENDING", "500"))
+
+# Сколько строк в одном INSERT
+READ_FLUSH_BATCH_ROWS = 1000
+
+# Потолок буфера: пока БД недоступна, сверх него отметки отбрасываются
+READ_BUFFER_MAX_PENDING = int(os.getenv("READ_BUFFER_MAX_PENDING", "100000"))
+
+# Сколько раз подряд повторяем запись, упавшую не из-за связи с БД,
+# прежде чем отбросить пачку
+READ_FLUSH_MAX_ATTEMPTS = 3
+
+
+def _insert_marks(rows):
+    # INSERT ... SELECT из VALUES с JOIN modules: отметка удалённого
+    # модуля просто не вставится, а не уронит всю пачку по внешнему ключу
+    marks = values(
+        column("user_id", String),
+        column("module_id", BigInteger),
+        name="marks",
+    ).data(rows)
+    return (
+        insert(ModuleRead)
+        .from_select(
+            ["user_id", "module_id"],
+            select(marks.c.user_id, marks.c.module_id).join(Module, Module.id == marks.c.module_id),
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "module_id"])
+    )
+
+
+class ModuleReadStore:
+    """
+    Хранилище отметок «модуль прочитан» с пакетной записью.
+
+    POST /modules/{id} только кладёт отметку в буфер в памяти
+    (user_id -> множество module_id). Фоновый поток раз в
+    READ_FLUSH_INTERVAL_SECONDS или при READ_FLUSH_MAX_PENDING отметках
+    пишет всё одним multi-row INSERT ... ON CONFLICT DO NOTHING.
+
+    Чтение объединяет БД и ещё не записанный буфер, поэтому пользователь
+    сразу видит свои отметки (в пределах пода). При падении пода теряется
+    не больше одного интервала отметок; при штатной остановке буфер
+    сбрасывается.
+
+    Отметки модулей, удалённых до записи, отсеиваются JOIN с modules.
+    Если запись не удалась, пачка возвращается в буфер (не больше
+    READ_BUFFER_MAX_PENDING отметок); ошибка не из-за связи с БД после
+    READ_FLUSH_MAX_ATTEMPTS попыток отбрасывает пачку, чтобы не
+    блокировать все следующие.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]) -> None:
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Set[int]] = {}
+        self._pending_count = 0
+        # Отметки, не попавшие в переполненный буфер, с прошлого flush
+        self._dropped = 0
+        self._failed_attempts = 0
+        # Один flush за раз: фоновый поток и stop() не пишут параллельно
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # --------- Запись ---------
+
+    def mark_read(self, user_id: str, module_id: int) -> None:
+        with self._lock:
+            modules = self._pending.setdefault(user_id, set())
+            if module_id in modules:
+                return
+            if self._pending_count >= READ_BUFFER_MAX_PENDING:
+                self._dropped += 1
+                return
+            modules.add(module_id)
+            self._pending_count += 1
+            full = self._pending_count >= READ_FLUSH_MAX_PENDING
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """
+        Пишет накопленные отметки в БД. Возвращает число строк в INSERT.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._pending_count = 0
+                dropped, self._dropped = self._dropped, 0
+            if dropped:
+                logger.warning("Буфер отметок о прочтении переполнен, отброшено %s", dropped)
+            if not pending:
+                return 0
+
+            rows = [
+                (user_id, module_id)
+                for user_id, modules in pending.items()
+                for module_id in modules
+            ]
+            db = self._session_factory()
+            try:
+                for start in range(0, len(rows), READ_FLUSH_BATCH_ROWS):
+                    db.execute(_insert_marks(rows[start:start + READ_FLUSH_BATCH_ROWS]))
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                self._failed_attempts += 1
+                if isinstance(exc, OperationalError) or self._failed_attempts < READ_FLUSH_MAX_ATTEMPTS:
+                    # Попробуем в следующий раз
+                    self._requeue(pending)
+                    raise
+                self._failed_attempts = 0
+                logger.exception("Отметки о прочтении не записываются, отброшено %s", len(rows))
+                return 0
+            finally:
+                db.close()
+            self._failed_attempts = 0
+            return len(rows)
+
+    def _requeue(self, pending: Dict[str, Set[int]]) -> None:
+        with self._lock:
+            for user_id, modules in pending.items():
+                current = self._pending.setdefault(user_id, set())
+                for module_id in modules:
+                    if self._pending_count >= READ_BUFFER_MAX_PENDING:
+                        self._dropped += 1
+                    elif module_id not in current:
+                        current.add(module_id)
+                        self._pending_count += 1
+                if not current:
+                    del self._pending[user_id]
+
+    # --------- Чтение ---------
+
+    def read_module_ids(self, db: Session, user_id: str) -> Set[int]:
+        """
+        Все прочитанные пользователем модули: один запрос по PK + буфер.
+        """
+        res = db.execute(select(ModuleRead.module_id).where(ModuleRead.user_id == user_id))
+        read = set(res.scalars().all())
+        with self._lock:
+            read |= self._pending.get(user_id, set())
+        return read
+
+    def is_read(self, db: Session, user_id: str, module_id: int) -> bool:
+        with self._lock:
+            if module_id in self._pending.get(user_id, ()):
+                return True
+        res = db.execute(
+            select(ModuleRead.module_id).where(
+                ModuleRead.user_id == user_id,
+                ModuleRead.module_id == module_id,
+            )
+        )
+        return res.first() is not None
+
+    # --------- Жизненный цикл ---------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="module-read-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Не удалось записать отметки о прочтении при остановке")
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(READ_FLUSH_INTERVAL_SECONDS)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Не удалось записать отметки о прочтении")
@@ -0,0 +1,87 @@
+import html
+from typing import Any, Dict, List
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.config import SEARCH_CONFIG
+from app.models.module import Module
+from app.models.task import Task
+
+# ts_headline отмечает совпадения символами из Private Use Area: фрагмент
+# сначала экранируется как HTML, и только потом они становятся <mark>.
+# Из исходного текста эти символы вырезаются.
+_START_SEL = "\ue000"
+_STOP_SEL = "\ue001"
+
+# Параметры подсветки фрагментов (ts_headline)
+HEADLINE_OPTIONS = (
+    f"StartSel={_START_SEL}, StopSel={_STOP_SEL}, MaxFragments=2, MaxWords=25, MinWords=8"
+)
+
+
+def highlight(snippet: str) -> str:
+    """
+    Фрагмент ts_headline -> HTML: текст модуля или задачи экранирован,
+    разметка в нём — только <mark>.
+    """
+    escaped = html.escape(snippet, quote=True)
+    return escaped.replace(_START_SEL, "<mark>").replace(_STOP_SEL, "</mark>")
+
+
+def search_catalog(db: Session, q: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+    """
+    Ищет по модулям и задачам через GIN-индексы search_vector.
+
+    Сначала ранжируем и режем страницу по индексу, и только для
+    попавших в неё строк считаем ts_headline — он дорогой, потому что
+    заново разбирает исходный текст.
+    Возвращает limit + 1 строк, если они есть, — чтобы понять, есть ли
+    следующая страница.
+    """
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+
+    modules = select(
+        literal("module").label("type"),
+        Module.id.label("id"),
+        Module.title.label("title"),
+        func.ts_rank_cd(Module.search_vector, query).label("rank"),
+    ).where(Module.search_vector.op("@@")(query))
+
+    tasks = select(
+        literal("task").label("type"),
+        Task.id.label("id"),
+        Task.title.label("title"),
+        func.ts_rank_cd(Task.search_vector, query).label("rank"),
+    ).where(Task.search_vector.op("@@")(query))
+
+    hits = union_all(modules, tasks).subquery()
+    page = (
+        select(hits)
+        .order_by(hits.c.rank.desc(), hits.c.type, hits.c.id)
+        .limit(limit + 1)
+        .offset(offset)
+        .subquery()
+    )
+
+    # Текст для фрагмента берём по PK только для строк страницы
+    body = func.translate(
+        func.coalesce(Module.content, Task.description), _START_SEL + _STOP_SEL, ""
+    )
+    stmt = (
+        select(
+            page.c.type,
+            page.c.id,
+            page.c.title,
+            page.c.rank,
+            func.ts_headline(SEARCH_CONFIG, body, query, HEADLINE_OPTIONS).label("snippet"),
+        )
+        .select_from(page)
+        .outerjoin(Module, (page.c.type == "module") & (Module.id == page.c.id))
+        .outerjoin(Task, (page.c.type == "task") & (Task.id == page.c.id))
+        .order_by(page.c.rank.desc(), page.c.type, page.c.id)
+    )
+    return [
+        {**row._mapping, "snippet": highlight(row.snippet)}
+        for row in db.execute(stmt)
+    ]
@@ -1,18 +1,33 @@
+import threading
+import time
+from contextlib import asynccontextmanager
 from uuid import uuid4
-from typing import Any, Dict, List, Optional
+from typing import Annotated, Any, Dict, List, Optional
 
-from fastapi import FastAPI, Depends, HTTPException, Path, Header, Request, status
+from fastapi import FastAPI, Depends, HTTPException, Path, Header, Query, Request, Response, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+from sqlalchemy import func, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
-from app.db.session import SessionLocal
+from app.core.config import settings
+from app.core.responses import NegotiatedResponse
+from app.core.tracing import instrument_engine, setup_tracing, shutdown_tracing
+from app.db.read_store import ModuleReadStore
+from app.db.search import search_catalog
+from app.db.session import SessionLocal, dispose_engine, get_engine, warm_pool
+from app.db.bundles import load_test_bundles
 from app.db.base import Base  # noqa: F401  # важно, чтобы модели были импортированы
 
 from app.models.module import Module
+from app.models.progress import UserTaskProgress
 from app.models.task import Task
 from app.schemas.module import ModuleOut
+from app.schemas.progress import ProgressOut, TaskProgressOut
+from app.schemas.search import SearchPage
 from app.schemas.task import TaskOut
+from app.schemas.bundle import TestBundlesRequest
 from app.schemas.error import ErrorResponse
 
 
@@ -32,11 +47,45 @@ def get_db() -> Session:
 #  Приложение
 # =========================================================
 
+read_store = ModuleReadStore(SessionLocal)
+
+
+# Выставляется после первой успешной readiness-пробы
+_warmed_up = False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Движок создаётся здесь, соединения открывает /readyz или первый запрос.
+    # Схема — миграциями (entrypoint.sh), не create_all.
+    instrument_engine(get_engine())
+    read_store.start()
+    yield
+    # При остановке пода дописываем буфер отметок о прочтении
+    read_store.stop()
+    dispose_engine()
+    shutdown_tracing()
+
+
 app = FastAPI(
     title="Course Service",
     description="Сервис курса: модули и задачи. Работает поверх БД из course_db.sql.",
     version="1.0.0",
+    lifespan=lifespan,
 )
+setup_tracing(app, "course_service")
+
+
+# Пользователь, для которого считаем isRead. Пока без авторизации —
+# идентификатор приходит заголовком от клиента/gateway.
+UserIdHeader = Annotated[
+    Optional[str],
+    Header(
+        alias="X-User-Id",
+        max_length=64,
+        description="Идентификатор пользователя (для отметок о прочтении)",
+    ),
+]
 
 
 # =========================================================
@@ -59,35 +108,72 @@ def _short_description(text: str, max_len: int = 200) -> str:
     return truncated[:last_space] + "..."
 
 
-def module_to_schema(m: Module) -> ModuleOut:
+def _set_catalog_cache_headers(response: Response, user_id: Optional[str] = None) -> None:
     """
-    Маппинг SQLAlchemy-модели Module -> Pydantic-схема ModuleOut
-    под контракт course.api.
+    Каталог меняется редко, разрешаем gateway (proxy_cache) его кэшировать.
+    Ответ с isRead конкретного пользователя в общий кэш не кладём.
     """
-    return ModuleOut(
-        id=m.id,
-        title=m.title,
-        description=_short_description(m.content),
-        order=m.order_index,
-        # В схемe БД нет информации о прочитанности модулей пользователем,
-        # поэтому пока всегда false.
-        isRead=False,
-        content=m.content
-    )
+    if user_id:
+        response.headers["Cache-Control"] = "private, no-store"
+        return
+    response.headers["Cache-Control"] = f"public, max-age={settings.catalog_cache_max_age}"
 
 
-def task_to_schema(t: Task) -> TaskOut:
+def module_to_dict(m: Module, is_read: bool = False) -> Dict[str, Any]:
+    """
+    Маппинг SQLAlchemy-модели Module -> словарь в форме ModuleOut
+    под контракт course.api. Типы уже те, что нужны схеме, поэтому
+    списки отдаются без повторной валидации Pydantic.
+    """
+    return {
+        "id": m.id,
+        "title": m.title,
+        "description": _short_description(m.content),
+        "order": m.order_index,
+        "isRead": is_read,
+        "content": m.content,
+    }
+
+
+def module_to_schema(m: Module, is_read: bool = False) -> ModuleOut:
+    return ModuleOut(**module_to_dict(m, is_read))
+
+
+def task_to_dict(t: Task) -> Dict[str, Any]:
     """
-    Маппинг SQLAlchemy-модели Task -> Pydantic-схема TaskOut.
+    Маппинг SQLAlchemy-модели Task -> словарь в форме TaskOut.
     maxScore берём константой (например, 100).
     """
-    return TaskOut(
-        id=t.id,
-        moduleId=t.module_id,
-        title=t.title,
-        description=t.description,
-        maxScore=100,
-    )
+    return {
+        "id": t.id,
+        "moduleId": t.module_id,
+        "title": t.title,
+        "description": t.description,
+        "maxScore": 100,
+    }
+
+
+def task_to_schema(t: Task) -> TaskOut:
+    return TaskOut(**task_to_dict(t))
+
+
+# Число задач в каждом модуле — часть каталога, меняется редко,
+# поэтому держим в памяти столько же, сколько каталог живёт в кэше gateway.
+_module_task_counts_cache: Dict[str, Any] = {"expires_at": 0.0, "counts": {}}
+_module_task_counts_lock = threading.Lock()
+
+
+def _module_task_counts(db: Session) -> Dict[int, int]:
+    now = time.monotonic()
+    with _module_task_counts_lock:
+        if now < _module_task_counts_cache["expires_at"]:
+            return _module_task_counts_cache["counts"]
+    rows = db.query(Task.module_id, func.count(Task.id)).group_by(Task.module_id).all()
+    counts = {module_id: count for module_id, count in rows if module_id is not None}
+    with _module_task_counts_lock:
+        _module_task_counts_cache["counts"] = counts
+        _module_task_counts_cache["expires_at"] = now + settings.catalog_cache_max_age
+    return counts
 
 
 # =========================================================
@@ -153,6 +239,30 @@ def healthz() -> Dict[str, Any]:
     return {"status": "ok", "service": "course"}
 
 
+@app.get("/readyz", summary="Readiness", tags=["Service"])
+def readyz() -> Dict[str, Any]:
+    """
+    При первом вызове прогревает пул соединений и кэш каталога,
+    дальше только проверяет, что БД отвечает. Пока БД недоступна — 503.
+    """
+    global _warmed_up
+    try:
+        if not _warmed_up:
+            warm_pool()
+            db = SessionLocal()
+            try:
+                _module_task_counts(db)
+            finally:
+                db.close()
+            _warmed_up = True
+        else:
+            with get_engine().connect() as conn:
+                conn.execute(text("SELECT 1"))
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database is not available")
+    return {"status": "ready", "service": "course"}
+
+
 # =========================================================
 #  Modules
 # =========================================================
@@ -163,12 +273,24 @@ def healthz() -> Dict[str, Any]:
     summary="Получить список модулей",
     tags=["Modules"],
 )
-def list_modules(db: Session = Depends(get_db)) -> List[ModuleOut]:
+def list_modules(
+    request: Request,
+    user_id: UserIdHeader = None,
+    db: Session = Depends(get_db),
+) -> Response:
     """
     Читает все модули из таблицы modules, сортирует по order_index.
+    isRead для всех модулей берётся одним запросом к module_reads.
+    Формат ответа — по Accept (JSON или application/msgpack).
     """
     modules = db.query(Module).order_by(Module.order_index).all()
-    return [module_to_schema(m) for m in modules]
+    read_ids = read_store.read_module_ids(db, user_id) if user_id else set()
+    response = NegotiatedResponse(
+        [module_to_dict(m, m.id in read_ids) for m in modules],
+        accept=request.headers.get("accept"),
+    )
+    _set_catalog_cache_headers(response, user_id)
+    return response
 
 
 @app.get(
@@ -178,7 +300,9 @@ def list_modules(db: Session = Depends(get_db)) -> List[ModuleOut]:
     tags=["Modules"],
 )
 def get_module(
+    response: Response,
     module_id: int = Path(..., ge=1, description="ID модуля (целое число >= 1)"),
+    user_id: UserIdHeader = None,
     db: Session = Depends(get_db),
 ) -> ModuleOut:
     """
@@ -187,7 +311,9 @@ def get_module(
     m: Optional[Module] = db.query(Module).filter(Module.id == module_id).first()
     if m is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Module not found")
-    return module_to_schema(m)
+    _set_catalog_cache_headers(response, user_id)
+    is_read = read_store.is_read(db, user_id, m.id) if user_id else False
+    return module_to_schema(m, is_read)
 
 
 @app.post(
@@ -203,20 +329,23 @@ def mark_module_read(
         alias="X-Idempotency-Key",
         description="Уникальный идентификатор запроса для обеспечения идемпотентности",
     ),
+    user_id: UserIdHeader = None,
     db: Session = Depends(get_db),
 ) -> None:
     """
-    По контракту это “отметить модуль прочитанным”.
-    В текущей схеме БД такого состояния нет, поэтому:
+    По контракту это “отметить модуль прочитанным”:
     - проверяем, что модуль существует;
     - если нет — 404;
-    - если есть — просто возвращаем 204 No Content.
+    - если есть — кладём отметку в буфер read_store и возвращаем 204.
+    Повтор с тем же ключом безопасен: отметка идемпотентна сама по себе
+    (ON CONFLICT DO NOTHING при записи).
     """
     m: Optional[Module] = db.query(Module).filter(Module.id == module_id).first()
     if m is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Module not found")
 
-    # Здесь могла бы быть логика сохранения fact "прочитанности" в отдельную таблицу.
+    if user_id:
+        read_store.mark_read(user_id, m.id)
     return None
 
 
@@ -230,12 +359,18 @@ def mark_module_read(
     summary="Получить список задач",
     tags=["Tasks"],
 )
-def list_tasks(db: Session = Depends(get_db)) -> List[TaskOut]:
+def list_tasks(request: Request, db: Session = Depends(get_db)) -> Response:
     """
     Возвращает список всех задач из таблицы tasks.
+    Формат ответа — по Accept (JSON или application/msgpack).
     """
     tasks = db.query(Task).order_by(Task.order_index).all()
-    return [task_to_schema(t) for t in tasks]
+    response = NegotiatedResponse(
+        [task_to_dict(t) for t in tasks],
+        accept=request.headers.get("accept"),
+    )
+    _set_catalog_cache_headers(response)
+    return response
 
 
 @app.get(
@@ -245,6 +380,7 @@ def list_tasks(db: Session = Depends(get_db)) -> List[TaskOut]:
     tags=["Tasks"],
 )
 def get_task(
+    response: Response,
     task_id: int = Path(..., ge=1, description="ID задачи (целое число >= 1)"),
     db: Session = Depends(get_db),
 ) -> TaskOut:
@@ -254,4 +390,125 @@ def get_task(
     t: Optional[Task] = db.query(Task).filter(Task.id == task_id).first()
     if t is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    _set_catalog_cache_headers(response)
     return task_to_schema(t)
+
+
+# =========================================================
+#  Search
+# =========================================================
+
+@app.get(
+    "/search",
+    response_model=SearchPage,
+    summary="Полнотекстовый поиск по модулям и задачам",
+    tags=["Search"],
+)
+def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос (синтаксис websearch)"),
+    limit: int = Query(20, ge=1, le=50, description="Размер страницы"),
+    offset: int = Query(0, ge=0, le=1000, description="Смещение от начала выдачи"),
+    db: Session = Depends(get_db),
+) -> Response:
+    """
+    Ищет по modules.title/content и tasks.title/description
+    (GIN-индексы по сгенерированным колонкам search_vector).
+    Результаты отсортированы по релевантности, с подсвеченными фрагментами.
+    """
+    rows = search_catalog(db, q, limit, offset)
+    response = NegotiatedResponse(
+        {
+            "items": rows[:limit],
+            "limit": limit,
+            "offset": offset,
+            "hasMore": len(rows) > limit,
+        },
+        accept=request.headers.get("accept"),
+    )
+    _set_catalog_cache_headers(response)
+    return response
+
+
+# =========================================================
+#  Progress
+# =========================================================
+
+@app.get(
+    "/progress",
+    response_model=ProgressOut,
+    summary="Прогресс пользователя по курсу",
+    tags=["Progress"],
+)
+def get_progress(
+    response: Response,
+    user_id: Annotated[
+        str,
+        Header(alias="X-User-Id", max_length=64, description="Идентификатор пользователя"),
+    ],
+    db: Session = Depends(get_db),
+) -> ProgressOut:
+    """
+    Лучший балл по каждой задаче и пройденные модули одним запросом.
+    Читает агрегат user_task_progress (его обновляет judge_service
+    на каждом вердикте) по первичному ключу, сырые submissions не трогает.
+    """
+    response.headers["Cache-Control"] = "private, no-store"
+    rows = (
+        db.query(UserTaskProgress, Task.module_id)
+        .join(Task, Task.id == UserTaskProgress.task_id)
+        .filter(UserTaskProgress.user_id == user_id)
+        .order_by(UserTaskProgress.task_id)
+        .all()
+    )
+
+    tasks: List[TaskProgressOut] = []
+    solved_per_module: Dict[int, int] = {}
+    for p, module_id in rows:
+        tasks.append(
+            TaskProgressOut(
+                taskId=p.task_id,
+                moduleId=module_id,
+                bestScore=p.best_score,
+                attempts=p.attempts,
+                solved=p.solved,
+            )
+        )
+        # tasks.module_id обнуляется при удалении модуля (ON DELETE SET NULL)
+        if p.solved and module_id is not None:
+            solved_per_module[module_id] = solved_per_module.get(module_id, 0) + 1
+
+    totals = _module_task_counts(db)
+    completed = sorted(
+        module_id
+        for module_id, solved in solved_per_module.items()
+        if solved >= totals.get(module_id, 0)
+    )
+    return ProgressOut(userId=user_id, tasks=tasks, completedModules=completed)
+
+
+# =========================================================
+#  Internal (judge_service)
+# =========================================================
+
+@app.post(
+    "/internal/test-bundles",
+    summary="Пакеты тестов для judge_service",
+    tags=["Internal"],
+)
+def get_test_bundles(
+    payload: TestBundlesRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+) -> Response:
+    """
+    Версионированные тесты сразу для многих задач. Клиент передаёт
+    версии, которые у него уже есть, — тесты возвращаются только для
+    изменившихся задач. Ответ в msgpack (Accept: application/msgpack)
+    или JSON. Через gateway не публикуется.
+    """
+    known = {item.taskId: item.version for item in payload.tasks}
+    return NegotiatedResponse(
+        load_test_bundles(db, known),
+        accept=request.headers.get("accept"),
+    )
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, Integer, BigInteger, String, Text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 
+from app.core.config import SEARCH_CONFIG
 from app.db.base_class import Base
 
 
@@ -13,5 +15,16 @@ class Module(Base):
     content = Column(Text, nullable=False)
     order_index = Column(Integer, nullable=False)
 
+    # Полнотекстовый индекс (GIN): заголовок важнее текста.
+    # deferred — обычные выборки модулей его не тянут.
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'B')",
+            persisted=True,
+        ),
+    ))
+
     # Связь с задачами
     tasks = relationship("Task", back_populates="module")
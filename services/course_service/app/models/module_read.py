@@ -0,0 +1,13 @@
+from sqlalchemy import Column, BigInteger, String, DateTime, ForeignKey, func
+
+from app.db.base_class import Base
+
+
+class ModuleRead(Base):
+    __tablename__ = "module_reads"
+
+    # Одна строка на пару (пользователь, модуль). PK (user_id, module_id)
+    # отдаёт все прочитанные модули пользователя одним index-only scan.
+    user_id = Column(String(64), primary_key=True)
+    module_id = Column(BigInteger, ForeignKey("modules.id", ondelete="CASCADE"), primary_key=True)
+    read_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
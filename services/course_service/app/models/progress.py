@@ -0,0 +1,17 @@
+from sqlalchemy import Column, BigInteger, Boolean, DateTime, ForeignKey, Integer, String, func
+
+from app.db.base_class import Base
+
+
+class UserTaskProgress(Base):
+    __tablename__ = "user_task_progress"
+
+    # Агрегат прогресса: одна строка на (пользователь, задача).
+    # Обновляется judge_service при каждом вердикте, здесь только читается.
+    user_id = Column(String(64), primary_key=True)
+    task_id = Column(BigInteger, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    best_score = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    solved = Column(Boolean, nullable=False, default=False)
+    first_solved_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
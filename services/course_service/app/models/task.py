@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, Float, Integer, BigInteger, String, Text, Boolean, ForeignKey
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 
+from app.core.config import SEARCH_CONFIG
 from app.db.base_class import Base
 
 
@@ -15,5 +17,24 @@ class Task(Base):
     language = Column(String(50), nullable=False, default="python")
     is_free = Column(Boolean, nullable=False, default=False)
     order_index = Column(Integer, nullable=False, default=1)
+    # Версия пакета тестов для judge: растёт при изменении test_cases
+    # или языка задачи (триггеры, миграция 2c6d9e4f7a18)
+    tests_version = Column(BigInteger, nullable=False, server_default="1")
+
+    # Как judge сверяет вывод: exact / tokens / float / lines / custom
+    # (checker_code — программа-чекер на Python). Наружу не отдаются.
+    checker = Column(String(32), nullable=False, server_default="exact")
+    checker_epsilon = Column(Float, nullable=True)
+    checker_code = deferred(Column(Text, nullable=True))
+
+    # Полнотекстовый индекс (GIN) по заголовку и условию задачи
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+    ))
 
     module = relationship("Module", back_populates="tasks")
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, BigInteger, Index, Text, ForeignKey
+
+from app.db.base_class import Base
+
+
+class TestCase(Base):
+    # Имя из предметной области, не тест: pytest не собирает
+    __test__ = False
+
+    __tablename__ = "test_cases"
+    __table_args__ = (Index("idx_test_cases_task_id", "task_id"),)
+
+    # course_db.sql: id bigint, task_id bigint, input_data text, expected_output text.
+    # Любое изменение строк поднимает tasks.tests_version (триггер, миграция 2c6d9e4f7a18).
+    id = Column(BigInteger, primary_key=True, index=True)
+    task_id = Column(BigInteger, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    input_data = Column(Text, nullable=False)
+    expected_output = Column(Text, nullable=False)
@@ -0,0 +1,24 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+# Сколько задач можно запросить за один вызов
+MAX_BUNDLES_PER_REQUEST = 500
+
+
+class KnownBundle(BaseModel):
+    """
+    Задача и версия её тестов, которая уже есть у клиента.
+    """
+    taskId: int = Field(..., description="Идентификатор задачи")
+    version: Optional[int] = Field(None, description="Версия тестов в кэше клиента, null — нет в кэше")
+
+
+class TestBundlesRequest(BaseModel):
+    """
+    Запрос пакетов тестов для нескольких задач.
+    """
+    # Имя из предметной области, не тест: pytest не собирает
+    __test__ = False
+
+    tasks: List[KnownBundle] = Field(..., max_length=MAX_BUNDLES_PER_REQUEST)
@@ -0,0 +1,33 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, ConfigDict
+
+
+class TaskProgressOut(BaseModel):
+    """
+    Прогресс пользователя по одной задаче.
+    """
+    taskId: int = Field(..., description="Идентификатор задачи")
+    moduleId: Optional[int] = Field(
+        ...,
+        description="Идентификатор модуля задачи (null — задача вне модуля, например модуль удалён)",
+    )
+    bestScore: int = Field(..., description="Лучший балл среди посылок")
+    attempts: int = Field(..., description="Сколько посылок проверено")
+    solved: bool = Field(..., description="Есть ли хотя бы одна успешная посылка")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProgressOut(BaseModel):
+    """
+    Сводка для дашборда прогресса пользователя.
+    """
+    userId: str = Field(..., description="Идентификатор пользователя")
+    tasks: List[TaskProgressOut] = Field(..., description="Задачи, по которым были посылки")
+    completedModules: List[int] = Field(
+        ...,
+        description="Модули, все задачи которых решены",
+    )
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,31 @@
+from typing import List, Literal
+
+from pydantic import BaseModel, Field, ConfigDict
+
+
+class SearchHit(BaseModel):
+    """
+    Один результат поиска: модуль или задача.
+    """
+    type: Literal["module", "task"] = Field(..., description="Что найдено: модуль или задача")
+    id: int = Field(..., description="Идентификатор модуля или задачи")
+    title: str = Field(..., description="Название")
+    rank: float = Field(..., description="Релевантность (ts_rank_cd), больше — лучше")
+    snippet: str = Field(
+        ...,
+        description="Фрагмент текста как HTML: текст экранирован, подсветка <mark>…</mark>",
+    )
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SearchPage(BaseModel):
+    """
+    Страница результатов поиска.
+    """
+    items: List[SearchHit] = Field(..., description="Результаты по убыванию релевантности")
+    limit: int = Field(..., description="Размер страницы")
+    offset: int = Field(..., description="Смещение от начала выдачи")
+    hasMore: bool = Field(..., description="Есть ли следующая страница")
+
+    model_config = ConfigDict(from_attributes=True)
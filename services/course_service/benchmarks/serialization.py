@@ -0,0 +1,98 @@
+"""
+Сериализация ответа-списка: путь через response_model (Pydantic) против
+NegotiatedResponse (orjson / msgpack). Без БД и HTTP — только то, что
+происходит с уже выбранными строками. Запуск из services/course_service:
+
+    python -m benchmarks.serialization [--items 1000] [--repeat 200]
+
+Печатает время на ответ из --items модулей и размер тела.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.responses import MSGPACK_MEDIA_TYPE, NegotiatedResponse
+from app.main import module_to_dict, module_to_schema
+from app.models.module import Module
+from app.schemas.module import ModuleOut
+
+CONTENT = (
+    "Списки в Python — изменяемые последовательности. "
+    "Разберём срезы, list comprehension и сложность операций. "
+) * 8
+
+
+def make_modules(count: int) -> List[Module]:
+    return [
+        Module(id=i, title=f"Модуль {i}", content=CONTENT, order_index=i)
+        for i in range(1, count + 1)
+    ]
+
+
+def pydantic_path(field) -> Callable[[List[Module]], bytes]:
+    # Как FastAPI обрабатывает response_model: модели -> валидация по
+    # полю ответа -> jsonable -> json.dumps в JSONResponse
+    loop = asyncio.new_event_loop()
+
+    def render(modules: List[Module]) -> bytes:
+        content = loop.run_until_complete(
+            serialize_response(
+                field=field,
+                response_content=[module_to_schema(m) for m in modules],
+            )
+        )
+        return JSONResponse(content).body
+
+    return render
+
+
+def negotiated_path(accept: str) -> Callable[[List[Module]], bytes]:
+    def render(modules: List[Module]) -> bytes:
+        return NegotiatedResponse([module_to_dict(m) for m in modules], accept=accept).body
+
+    return render
+
+
+def measure(render: Callable[[List[Module]], bytes], modules: List[Module], repeat: int):
+    body = render(modules)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render(modules)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    modules = make_modules(args.items)
+    field = create_model_field("response", List[ModuleOut], mode="serialization")
+    paths = [
+        ("response_model (Pydantic)", pydantic_path(field)),
+        ("NegotiatedResponse JSON", negotiated_path("application/json")),
+        ("NegotiatedResponse msgpack", negotiated_path(MSGPACK_MEDIA_TYPE)),
+    ]
+
+    baseline = None
+    print(f"{args.items} модулей, медиана из {args.repeat} повторов")
+    for name, render in paths:
+        seconds, size = measure(render, modules, args.repeat)
+        baseline = baseline or seconds
+        print(
+            f"{name:28} {seconds * 1000:8.2f} мс  "
+            f"x{baseline / seconds:5.1f}  {size / 1024:8.1f} КиБ"
+        )
+
+
+if __name__ == "__main__":
+    main()
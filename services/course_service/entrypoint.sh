@@ -3,7 +3,8 @@ set -e
 
 sleep 2
 
-# Надо будет подогнать миграции под скрипт Артема чтобы они заработали
-# alembic upgrade head || true
+# Схема — только через миграции. Базовая миграция совместима с course_db.sql,
+# advisory lock в env.py не даёт нескольким подам накатывать одновременно.
+alembic upgrade head
 
 exec uvicorn app.main:app --host 0.0.0.0 --port ${APP_PORT:-8000}
@@ -3,7 +3,7 @@ from logging.config import fileConfig
 import os
 
 from sqlalchemy import create_engine, pool
-from app.db.base_class import Base
+from app.db.base import Base  # импортирует и модели
 
 config = context.config
 if config.config_file_name is not None:
@@ -11,6 +11,9 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+# Ключ advisory lock: поды, стартующие одновременно, накатывают по очереди
+MIGRATION_LOCK_KEY = 7_301_001
+
 def _get_sync_url() -> str:
     url = os.getenv("DATABASE_SYNC_URL")
     return url
@@ -31,9 +34,19 @@ def run_migrations_online() -> None:
     url = _get_sync_url()
     connectable = create_engine(url, poolclass=pool.NullPool)
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
-        with context.begin_transaction():
-            context.run_migrations()
+        connection.exec_driver_sql(f"SELECT pg_advisory_lock({MIGRATION_LOCK_KEY})")
+        # Блокировка сессионная, а транзакцию, открытую запросом, alembic
+        # счёл бы внешней и не закоммитил миграции — закрываем её сразу
+        connection.commit()
+        try:
+            context.configure(connection=connection, target_metadata=target_metadata)
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            # После ошибки транзакция прервана, unlock в ней не выполнится
+            connection.rollback()
+            connection.exec_driver_sql(f"SELECT pg_advisory_unlock({MIGRATION_LOCK_KEY})")
+            connection.commit()
 
 
 
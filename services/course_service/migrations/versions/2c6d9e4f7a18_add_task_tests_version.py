@@ -0,0 +1,69 @@
+"""add task tests version
+
+Revision ID: 2c6d9e4f7a18
+Revises: 5e7a0c3f9b12
+Create Date: 2026-10-19 17:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '2c6d9e4f7a18'
+down_revision = '5e7a0c3f9b12'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Версия пакета тестов, по которой judge_service сверяет свой кэш
+    op.add_column(
+        "tasks",
+        sa.Column("tests_version", sa.BigInteger(), nullable=False, server_default="1"),
+    )
+
+    # Любая запись в test_cases поднимает версию своей задачи
+    # (при переносе теста — обеих задач)
+    op.execute(
+        """
+        CREATE FUNCTION bump_task_tests_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                UPDATE tasks SET tests_version = tests_version + 1 WHERE id = OLD.task_id;
+            END IF;
+            IF TG_OP <> 'DELETE' AND (TG_OP = 'INSERT' OR NEW.task_id <> OLD.task_id) THEN
+                UPDATE tasks SET tests_version = tests_version + 1 WHERE id = NEW.task_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER test_cases_bump_tests_version "
+        "AFTER INSERT OR UPDATE OR DELETE ON test_cases "
+        "FOR EACH ROW EXECUTE FUNCTION bump_task_tests_version()"
+    )
+
+    # Язык задачи тоже входит в пакет
+    op.execute(
+        """
+        CREATE FUNCTION bump_task_language_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.tests_version := OLD.tests_version + 1;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER tasks_bump_tests_version "
+        "BEFORE UPDATE OF language ON tasks "
+        "FOR EACH ROW WHEN (NEW.language IS DISTINCT FROM OLD.language) "
+        "EXECUTE FUNCTION bump_task_language_version()"
+    )
+
+def downgrade():
+    op.execute("DROP TRIGGER tasks_bump_tests_version ON tasks")
+    op.execute("DROP FUNCTION bump_task_language_version()")
+    op.execute("DROP TRIGGER test_cases_bump_tests_version ON test_cases")
+    op.execute("DROP FUNCTION bump_task_tests_version()")
+    op.drop_column("tasks", "tests_version")
@@ -0,0 +1,27 @@
+"""create module_reads
+
+Revision ID: 3b9e1c7a5d20
+Revises: f773d24842da
+Create Date: 2026-10-19 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '3b9e1c7a5d20'
+down_revision = 'f773d24842da'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "module_reads",
+        sa.Column("user_id", sa.String(length=64), nullable=False),
+        sa.Column("module_id", sa.BigInteger(), nullable=False),
+        sa.Column("read_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("user_id", "module_id"),
+        sa.ForeignKeyConstraint(["module_id"], ["modules.id"], ondelete="CASCADE"),
+    )
+
+def downgrade():
+    op.drop_table("module_reads")
@@ -0,0 +1,34 @@
+"""reject blank checker code
+
+Revision ID: 4f8c2a1d6b37
+Revises: 9a3b5c7d1e42
+Create Date: 2026-10-19 20:00:00.000000
+"""
+
+from alembic import op
+
+revision = '4f8c2a1d6b37'
+down_revision = '9a3b5c7d1e42'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Пустая программа-чекер завершается без вердикта, judge считает
+    # это ошибкой чекера — такую задачу не даём и сохранить
+    op.drop_constraint("ck_tasks_checker", "tasks", type_="check")
+    op.create_check_constraint(
+        "ck_tasks_checker",
+        "tasks",
+        "checker IN ('exact', 'tokens', 'float', 'lines', 'custom') "
+        "AND (checker <> 'custom' OR (checker_code IS NOT NULL "
+        "AND btrim(checker_code, E' \\t\\r\\n') <> ''))",
+    )
+
+def downgrade():
+    op.drop_constraint("ck_tasks_checker", "tasks", type_="check")
+    op.create_check_constraint(
+        "ck_tasks_checker",
+        "tasks",
+        "checker IN ('exact', 'tokens', 'float', 'lines', 'custom') "
+        "AND (checker <> 'custom' OR checker_code IS NOT NULL)",
+    )
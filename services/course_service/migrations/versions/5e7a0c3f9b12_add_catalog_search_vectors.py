@@ -0,0 +1,53 @@
+"""add catalog search vectors
+
+Revision ID: 5e7a0c3f9b12
+Revises: 8d4f2a6c1e93
+Create Date: 2026-10-19 14:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '5e7a0c3f9b12'
+down_revision = '8d4f2a6c1e93'
+branch_labels = None
+depends_on = None
+
+# Должно совпадать с SEARCH_CONFIG в app/core/config.py
+SEARCH_CONFIG = "russian"
+
+def upgrade():
+    op.add_column(
+        "modules",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'B')",
+                persisted=True,
+            ),
+        ),
+    )
+    op.create_index("ix_modules_search_vector", "modules", ["search_vector"], postgresql_using="gin")
+
+    op.add_column(
+        "tasks",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+        ),
+    )
+    op.create_index("ix_tasks_search_vector", "tasks", ["search_vector"], postgresql_using="gin")
+
+def downgrade():
+    op.drop_index("ix_tasks_search_vector", table_name="tasks")
+    op.drop_column("tasks", "search_vector")
+    op.drop_index("ix_modules_search_vector", table_name="modules")
+    op.drop_column("modules", "search_vector")
@@ -0,0 +1,31 @@
+"""create user_task_progress
+
+Revision ID: 8d4f2a6c1e93
+Revises: 3b9e1c7a5d20
+Create Date: 2026-10-19 12:30:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '8d4f2a6c1e93'
+down_revision = '3b9e1c7a5d20'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "user_task_progress",
+        sa.Column("user_id", sa.String(length=64), nullable=False),
+        sa.Column("task_id", sa.BigInteger(), nullable=False),
+        sa.Column("best_score", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("solved", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("first_solved_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("user_id", "task_id"),
+        sa.ForeignKeyConstraint(["task_id"], ["tasks.id"], ondelete="CASCADE"),
+    )
+
+def downgrade():
+    op.drop_table("user_task_progress")
@@ -0,0 +1,49 @@
+"""add task checkers
+
+Revision ID: 9a3b5c7d1e42
+Revises: 2c6d9e4f7a18
+Create Date: 2026-10-19 18:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '9a3b5c7d1e42'
+down_revision = '2c6d9e4f7a18'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("tasks", sa.Column("checker", sa.String(length=32), nullable=False, server_default="exact"))
+    op.add_column("tasks", sa.Column("checker_epsilon", sa.Float(), nullable=True))
+    op.add_column("tasks", sa.Column("checker_code", sa.Text(), nullable=True))
+    op.create_check_constraint(
+        "ck_tasks_checker",
+        "tasks",
+        "checker IN ('exact', 'tokens', 'float', 'lines', 'custom') "
+        "AND (checker <> 'custom' OR checker_code IS NOT NULL)",
+    )
+
+    # Чекер входит в пакет тестов judge — его смена тоже поднимает версию
+    op.execute("DROP TRIGGER tasks_bump_tests_version ON tasks")
+    op.execute(
+        "CREATE TRIGGER tasks_bump_tests_version "
+        "BEFORE UPDATE OF language, checker, checker_epsilon, checker_code ON tasks "
+        "FOR EACH ROW WHEN ("
+        "(NEW.language, NEW.checker, NEW.checker_epsilon, NEW.checker_code) IS DISTINCT FROM "
+        "(OLD.language, OLD.checker, OLD.checker_epsilon, OLD.checker_code)) "
+        "EXECUTE FUNCTION bump_task_language_version()"
+    )
+
+def downgrade():
+    op.execute("DROP TRIGGER tasks_bump_tests_version ON tasks")
+    op.execute(
+        "CREATE TRIGGER tasks_bump_tests_version "
+        "BEFORE UPDATE OF language ON tasks "
+        "FOR EACH ROW WHEN (NEW.language IS DISTINCT FROM OLD.language) "
+        "EXECUTE FUNCTION bump_task_language_version()"
+    )
+    op.drop_constraint("ck_tasks_checker", "tasks", type_="check")
+    op.drop_column("tasks", "checker_code")
+    op.drop_column("tasks", "checker_epsilon")
+    op.drop_column("tasks", "checker")
@@ -14,21 +14,47 @@ branch_labels = None
 depends_on = None
 
 def upgrade():
-    op.create_table(
-        "modules",
-        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
-        sa.Column("title", sa.String(length=255), nullable=False),
-    )
-    op.create_table(
-        "tasks",
-        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
-        sa.Column("module_id", sa.Integer(), nullable=False),
-        sa.Column("question", sa.String(length=500), nullable=False),
-        sa.ForeignKeyConstraint(["module_id"], ["modules.id"]),
-    )
-    op.create_index("ix_tasks_module_id", "tasks", ["module_id"])
+    # Базовая схема каталога — как в course_db.sql. Если база поднята
+    # из дампа, таблицы уже есть, и миграция их не трогает.
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("modules"):
+        op.create_table(
+            "modules",
+            sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+            sa.Column("title", sa.String(length=255), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("order_index", sa.Integer(), nullable=False),
+        )
+        op.create_index("idx_modules_order", "modules", ["order_index"], unique=True)
+
+    if not inspector.has_table("tasks"):
+        op.create_table(
+            "tasks",
+            sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+            sa.Column("module_id", sa.BigInteger(), nullable=True),
+            sa.Column("title", sa.String(length=255), nullable=False),
+            sa.Column("description", sa.Text(), nullable=False),
+            sa.Column("language", sa.String(length=50), nullable=False, server_default="python"),
+            sa.Column("is_free", sa.Boolean(), nullable=False, server_default=sa.false()),
+            sa.Column("order_index", sa.Integer(), nullable=False, server_default="1"),
+            sa.ForeignKeyConstraint(["module_id"], ["modules.id"], ondelete="SET NULL"),
+        )
+        op.create_index("idx_tasks_module_id", "tasks", ["module_id"])
+        op.create_index("idx_tasks_is_free", "tasks", ["is_free"])
+
+    if not inspector.has_table("test_cases"):
+        op.create_table(
+            "test_cases",
+            sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+            sa.Column("task_id", sa.BigInteger(), nullable=False),
+            sa.Column("input_data", sa.Text(), nullable=False),
+            sa.Column("expected_output", sa.Text(), nullable=False),
+            sa.ForeignKeyConstraint(["task_id"], ["tasks.id"], ondelete="CASCADE"),
+        )
+        op.create_index("idx_test_cases_task_id", "test_cases", ["task_id"])
 
 def downgrade():
-    op.drop_index("ix_tasks_module_id", table_name="tasks")
+    op.drop_table("test_cases")
     op.drop_table("tasks")
-    op.drop_table("modules")
\ No newline at end of file
+    op.drop_table("modules")
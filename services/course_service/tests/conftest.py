@@ -0,0 +1,47 @@
+"""
+Общие фикстуры тестов course_service. Запуск из services/course_service:
+
+    python -m pytest tests
+
+Тесты с БД идут против настоящего Postgres с накатанными миграциями
+(alembic upgrade head) и пропускаются, если COURSE_TEST_DATABASE_URL
+не задан.
+"""
+import os
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("COURSE_TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # app.db.session читает DATABASE_SYNC_URL при импорте
+    os.environ["DATABASE_SYNC_URL"] = TEST_DATABASE_URL
+
+
+@pytest.fixture
+def session_factory():
+    if not TEST_DATABASE_URL:
+        pytest.skip("COURSE_TEST_DATABASE_URL не задан")
+    import app.db.base  # noqa: F401  # все модели — для relationship
+    from app.db.session import SessionLocal, dispose_engine, get_engine
+
+    get_engine()
+    yield SessionLocal
+    dispose_engine()
+
+
+@pytest.fixture
+def module_id(session_factory):
+    """Модуль на время теста; его отметки о прочтении удалятся каскадом."""
+    from app.models.module import Module
+
+    db = session_factory()
+    try:
+        module = Module(title="Модуль теста", content="Текст", order_index=10_000)
+        db.add(module)
+        db.commit()
+        module_id = module.id
+        yield module_id
+        db.query(Module).filter(Module.id == module_id).delete()
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,149 @@
+"""
+Пакетная запись отметок о прочтении (app/db/read_store.py).
+"""
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.db import read_store
+from app.db.read_store import ModuleReadStore
+from app.models.module import Module
+from app.models.module_read import ModuleRead
+
+
+class FakeSession:
+    """Сессия без БД: запоминает INSERT и может падать на них."""
+
+    def __init__(self, log, error=None):
+        self._log = log
+        self._error = error
+
+    def execute(self, stmt):
+        if self._error is not None:
+            raise self._error
+        self._log.append(stmt.compile().params)
+
+    def commit(self):
+        self._log.append("commit")
+
+    def rollback(self):
+        self._log.append("rollback")
+
+    def close(self):
+        pass
+
+
+def fake_store(errors=()):
+    """Хранилище, у которого i-я сессия падает с errors[i] (None — не падает)."""
+    log = []
+    errors = list(errors)
+
+    def factory():
+        return FakeSession(log, errors.pop(0) if errors else None)
+
+    return ModuleReadStore(factory), log
+
+
+def pending(store):
+    return {user_id: set(modules) for user_id, modules in store._pending.items() if modules}
+
+
+def db_error(cls):
+    return cls("INSERT", {}, Exception("boom"))
+
+
+def test_flush_batches_rows(monkeypatch):
+    monkeypatch.setattr(read_store, "READ_FLUSH_BATCH_ROWS", 2)
+    store, log = fake_store()
+    for module_id in range(5):
+        store.mark_read("u1", module_id)
+    store.mark_read("u1", 0)
+
+    assert store.flush() == 5
+    inserts = [entry for entry in log if entry != "commit"]
+    assert [len(params) // 2 for params in inserts] == [2, 2, 1]
+    assert log[-1] == "commit"
+    assert pending(store) == {}
+    assert store.flush() == 0
+
+
+def test_failed_flush_requeues_marks():
+    store, log = fake_store([db_error(OperationalError)])
+    store.mark_read("u1", 1)
+    store.mark_read("u2", 2)
+
+    with pytest.raises(OperationalError):
+        store.flush()
+    assert pending(store) == {"u1": {1}, "u2": {2}}
+
+    store.mark_read("u1", 3)
+    assert store.flush() == 3
+    assert pending(store) == {}
+
+
+def test_bad_batch_is_dropped_after_retries():
+    errors = [db_error(IntegrityError)] * read_store.READ_FLUSH_MAX_ATTEMPTS
+    store, _ = fake_store(errors)
+    store.mark_read("u1", 1)
+
+    for _ in range(read_store.READ_FLUSH_MAX_ATTEMPTS - 1):
+        with pytest.raises(IntegrityError):
+            store.flush()
+    assert store.flush() == 0
+    assert pending(store) == {}
+
+    # Следующие отметки пишутся как обычно
+    store.mark_read("u1", 2)
+    assert store.flush() == 1
+
+
+def test_buffer_is_capped(monkeypatch):
+    monkeypatch.setattr(read_store, "READ_BUFFER_MAX_PENDING", 3)
+    store, _ = fake_store([db_error(OperationalError)])
+    for module_id in range(5):
+        store.mark_read("u1", module_id)
+    assert store._pending_count == 3
+
+    with pytest.raises(OperationalError):
+        store.flush()
+    store.mark_read("u2", 1)
+    assert store._pending_count == 3
+    assert pending(store) == {"u1": {0, 1, 2}}
+
+
+def test_stop_does_not_raise():
+    store, _ = fake_store([db_error(OperationalError)])
+    store.start()
+    store.mark_read("u1", 1)
+    store.stop()
+
+
+def test_reads_merge_database_and_buffer(session_factory, module_id):
+    store = ModuleReadStore(session_factory)
+    db = session_factory()
+    try:
+        assert store.read_module_ids(db, "reader") == set()
+        store.mark_read("reader", module_id)
+        assert store.is_read(db, "reader", module_id)
+        assert store.read_module_ids(db, "reader") == {module_id}
+        db.rollback()
+
+        assert store.flush() == 1
+        assert pending(store) == {}
+        assert store.read_module_ids(db, "reader") == {module_id}
+    finally:
+        db.close()
+
+
+def test_marks_of_deleted_modules_are_skipped(session_factory, module_id):
+    store = ModuleReadStore(session_factory)
+    db = session_factory()
+    try:
+        missing = db.query(Module.id).order_by(Module.id.desc()).first()[0] + 1000
+        store.mark_read("reader", missing)
+        store.mark_read("reader", module_id)
+        store.flush()
+        assert pending(store) == {}
+        rows = db.query(ModuleRead.module_id).filter(ModuleRead.user_id == "reader").all()
+        assert {row.module_id for row in rows} == {module_id}
+    finally:
+        db.close()
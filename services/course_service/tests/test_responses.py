@@ -0,0 +1,71 @@
+"""
+Выбор формата по Accept (app/core/responses.py; та же копия —
+в judge_service/app/responses.py).
+"""
+import msgpack
+import orjson
+import pytest
+
+from app.core.responses import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, NegotiatedResponse, wants_msgpack
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, False),
+        ("", False),
+        ("*/*", False),
+        ("application/json", False),
+        ("application/msgpack", True),
+        ("application/x-msgpack", True),
+        ("application/msgpack, application/json", True),
+        ("application/json, application/msgpack", True),
+        ("application/msgpack;q=0", False),
+        ("application/msgpack;q=0.0, */*", False),
+        ("application/msgpack;q=oops", False),
+        # JSON предпочтительнее — отдаём JSON
+        ("application/json, application/msgpack;q=0.1", False),
+        ("application/msgpack;q=0.5, application/json;q=0.9", False),
+        ("application/msgpack;q=0.5, */*", False),
+        ("application/msgpack;q=0.5, application/*;q=0.8", False),
+        ("application/msgpack;q=0.5, */*;q=0.1", True),
+        # Решает самое точное совпадение для JSON
+        ("application/json;q=0, application/msgpack;q=0.2, */*", True),
+        ("application/msgpack;q=0.9, application/*;q=0.8, application/json", False),
+        ("APPLICATION/MSGPACK; Q=0.7, application/json;q=0.6", True),
+    ],
+)
+def test_wants_msgpack(accept, expected):
+    assert wants_msgpack(accept) is expected
+
+
+def test_negotiated_response_body():
+    content = [{"id": 1, "title": "Модуль"}]
+    json_response = NegotiatedResponse(content, accept="application/json, application/msgpack;q=0.1")
+    assert json_response.media_type == JSON_MEDIA_TYPE
+    assert orjson.loads(json_response.body) == content
+
+    msgpack_response = NegotiatedResponse(content, accept=MSGPACK_MEDIA_TYPE)
+    assert msgpack_response.media_type == MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(msgpack_response.body, raw=False) == content
+    assert msgpack_response.headers["vary"] == "Accept"
+
+
+def test_datetimes_match_pydantic():
+    from datetime import datetime, timedelta, timezone
+
+    from pydantic import BaseModel
+
+    class Item(BaseModel):
+        at: datetime
+
+    for at in (
+        datetime(2026, 10, 19, 12, 30, tzinfo=timezone.utc),
+        datetime(2026, 10, 19, 12, 30, 0, 1500, tzinfo=timezone.utc),
+        datetime(2026, 10, 19, 12, 30, tzinfo=timezone(timedelta(hours=3))),
+    ):
+        expected = orjson.loads(Item(at=at).model_dump_json())["at"]
+        json_body = NegotiatedResponse([{"at": at}]).body
+        msgpack_body = NegotiatedResponse([{"at": at}], accept=MSGPACK_MEDIA_TYPE).body
+        assert orjson.loads(json_body)[0]["at"] == expected
+        assert msgpack.unpackb(msgpack_body, raw=False)[0]["at"] == expected
@@ -0,0 +1,36 @@
+"""
+Фрагменты поиска (app/db/search.py): текст курса экранируется, разметка
+в фрагменте — только <mark>.
+"""
+from app.db.search import highlight, search_catalog
+from app.models.module import Module
+
+CONTENT = (
+    "Сравнение a < b && b > c. Xyzzyplugh — слово для поиска, "
+    "<img src=x onerror=alert(1)// и \ue000ложная подсветка\ue001."
+)
+
+
+def test_highlight_escapes_text():
+    assert highlight("a < b \ue000match\ue001 & \"q\"") == "a &lt; b <mark>match</mark> &amp; &quot;q&quot;"
+
+
+def test_search_snippet_is_escaped(session_factory):
+    db = session_factory()
+    module = Module(title="Экранирование", content=CONTENT, order_index=10_001)
+    db.add(module)
+    db.commit()
+    try:
+        hits = [hit for hit in search_catalog(db, "xyzzyplugh", 10, 0) if hit["id"] == module.id]
+        assert len(hits) == 1
+        snippet = hits[0]["snippet"]
+        assert "<mark>Xyzzyplugh</mark>" in snippet
+        assert "&lt;img src=x onerror=alert(1)//" in snippet
+        assert "a &lt; b &amp;&amp; b &gt; c" in snippet
+        assert snippet.replace("<mark>", "").replace("</mark>", "").count("<") == 0
+        # Символы-границы подсветки из текста вырезаны
+        assert "ложная подсветка" in snippet and snippet.count("<mark>") == 1
+    finally:
+        db.delete(module)
+        db.commit()
+        db.close()
@@ -0,0 +1,221 @@
+"""
+Gateway с keepalive к upstream и без: сколько TCP-соединений nginx
+открывает к сервису и какая задержка у клиента.
+
+Берёт настоящий nginx.conf gateway, подменяет адреса upstream на
+локальный HTTP-сервер, который считает принятые соединения, и гоняет
+одну и ту же нагрузку дважды: с конфигом как есть и с убранными
+keepalive / proxy_http_version 1.1 / Connection "" (как до них).
+Запросы идут в /progress — он не кэшируется, каждый доходит до
+upstream. Нужен nginx в PATH (или --nginx), Docker не нужен:
+
+    python services/gateaway_service/benchmarks/keepalive.py \
+        [--requests 5000] [--concurrency 16] [--upstream-delay-ms 2]
+"""
+import argparse
+import http.client
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DEFAULT_CONFIG = Path(__file__).resolve().parent.parent / "nginx.conf"
+PATH = "/progress"
+
+# Что убираем из конфига для замера «без keepalive»
+KEEPALIVE_DIRECTIVES = [
+    re.compile(r"^\s*keepalive\s+\d+;\s*$", re.M),
+    re.compile(r"^\s*proxy_http_version\s+1\.1;\s*$", re.M),
+    re.compile(r'^\s*proxy_set_header\s+Connection\s+"";\s*$', re.M),
+]
+
+
+class CountingServer(ThreadingHTTPServer):
+    """Upstream: считает принятые TCP-соединения."""
+
+    daemon_threads = True
+
+    def __init__(self, address, delay: float) -> None:
+        super().__init__(address, UpstreamHandler)
+        self.delay = delay
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def get_request(self):
+        request = super().get_request()
+        with self._lock:
+            self.connections += 1
+        return request
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 — соединение живёт, пока nginx его не закроет
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        time.sleep(self.server.delay)
+        body = b'{"userId":"bench","solvedTasks":0,"tasks":[]}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def render_config(source: str, workdir: Path, listen_port: int, upstream_port: int, keepalive: bool) -> str:
+    """
+    Конфиг gateway для локального запуска: upstream и listen — на
+    127.0.0.1, логи и кэш — во workdir.
+    """
+    config = re.sub(
+        r"^(\s*)server\s+[\w.-]+:\d+;",
+        rf"\g<1>server 127.0.0.1:{upstream_port};",
+        source,
+        flags=re.M,
+    )
+    config = re.sub(r"^(\s*)listen\s+\d+;", rf"\g<1>listen 127.0.0.1:{listen_port};", config, flags=re.M)
+    config = re.sub(r"access_log\s+\S+", f"access_log {workdir}/access.log", config)
+    config = re.sub(r"proxy_cache_path\s+\S+", f"proxy_cache_path {workdir}/cache", config)
+    if not keepalive:
+        for directive in KEEPALIVE_DIRECTIVES:
+            config, found = directive.subn("", config)
+            if not found:
+                raise SystemExit(f"в конфиге нет {directive.pattern} — скрипт устарел")
+
+    temp_paths = "".join(
+        f"    {name}_temp_path {workdir}/{name};\n"
+        for name in ("client_body", "proxy", "fastcgi", "uwsgi", "scgi")
+    )
+    config = re.sub(r"^http\s*\{\n", lambda m: m.group(0) + temp_paths, config, count=1, flags=re.M)
+    header = f"daemon off;\npid {workdir}/nginx.pid;\nerror_log {workdir}/error.log;\n"
+    if os.geteuid() == 0:
+        # Иначе воркеры под nobody не пишут во workdir
+        header += "user root;\n"
+    return header + config
+
+
+def _wait_port(port: int, proc: subprocess.Popen, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"nginx завершился с кодом {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise SystemExit("nginx не начал слушать порт")
+
+
+def load(port: int, requests: int, concurrency: int) -> list:
+    """
+    concurrency клиентов, у каждого своё keepalive-соединение с nginx.
+    Возвращает задержки запросов в секундах.
+    """
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def client() -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        local = []
+        try:
+            while True:
+                with lock:
+                    if next(counter, None) is None:
+                        break
+                started = time.perf_counter()
+                conn.request("GET", PATH, headers={"X-User-Id": "bench"})
+                resp = conn.getresponse()
+                resp.read()
+                local.append(time.perf_counter() - started)
+                if resp.status != 200:
+                    raise RuntimeError(f"{PATH}: {resp.status}")
+        finally:
+            conn.close()
+            with lock:
+                latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def run(nginx: str, source: str, keepalive: bool, args) -> dict:
+    upstream = CountingServer(("127.0.0.1", _free_port()), args.upstream_delay_ms / 1000)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    listen_port = _free_port()
+    with tempfile.TemporaryDirectory(prefix="gateway-bench-") as tmp:
+        workdir = Path(tmp)
+        conf = workdir / "nginx.conf"
+        conf.write_text(
+            render_config(source, workdir, listen_port, upstream.server_address[1], keepalive),
+            encoding="utf-8",
+        )
+        proc = subprocess.Popen([nginx, "-p", tmp, "-c", str(conf)])
+        try:
+            _wait_port(listen_port, proc)
+            load(listen_port, min(args.concurrency * 10, args.requests), args.concurrency)
+            before = upstream.connections
+            started = time.perf_counter()
+            latencies = load(listen_port, args.requests, args.concurrency)
+            elapsed = time.perf_counter() - started
+        finally:
+            proc.terminate()
+            proc.wait()
+            upstream.shutdown()
+            upstream.server_close()
+    latencies.sort()
+    return {
+        "connections": upstream.connections - before,
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--config", type=Path, default=DEFAULT_CONFIG)
+    parser.add_argument("--nginx", default="nginx")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--upstream-delay-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    nginx = shutil.which(args.nginx)
+    if nginx is None:
+        sys.exit(f"{args.nginx} не найден")
+    source = args.config.read_text(encoding="utf-8")
+
+    print(f"{args.requests} запросов {PATH}, {args.concurrency} клиентов, {args.config}")
+    for label, keepalive in (("без keepalive", False), ("keepalive", True)):
+        result = run(nginx, source, keepalive, args)
+        print(
+            f"{label:14} соединений к upstream: {result['connections']:6}  "
+            f"{result['rps']:8.0f} rps  p50 {result['p50']:6.2f} мс  p99 {result['p99']:6.2f} мс"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Проверка вывода решения на тесте.
+
+Чекер задаётся задачей (course_service, tasks.checker) и приезжает
+в пакете тестов:
+- exact  — посимвольно, без учёта хвостовых пробелов и переводов строк;
+- tokens — последовательности токенов (любые пробельные разделители);
+- float  — как tokens, но числа сравниваются с точностью epsilon;
+- lines  — одинаковые непустые строки в любом порядке;
+- custom — своя программа-чекер на Python.
+
+Ошибка чекера (пустая программа, падение, таймаут, неизвестный код
+возврата) — не вердикт решения: check бросает CheckerError, и посылка
+получает статус ERROR.
+
+Встроенные чекеры идут по выводу потоком (finditer, find) и не строят
+split()/join() копий всего вывода — на больших выводах это заметно
+дешевле нормализации строки целиком.
+"""
+import logging
+import math
+import os
+import re
+import subprocess
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+
+from .sandbox import SANDBOX_ENV, SANDBOX_PYTHON_FLAGS
+from .bundles import CheckerSpec, TestCase
+
+logger = logging.getLogger(__name__)
+
+# Лимит времени на один запуск программы-чекера
+CHECKER_TIME_LIMIT_SECONDS = 5.0
+
+# Точность по умолчанию для чекера float
+DEFAULT_EPSILON = 1e-6
+
+# Чекер получает пути к файлам и отвечает кодом возврата. Коды не 0 и
+# не 1: с 0 завершается и чекер, который ничего не проверил, с 1 —
+# упавший с исключением.
+CHECKER_OK = 42
+CHECKER_WRONG_ANSWER = 43
+
+Check = Callable[[TestCase, str], bool]
+
+_TOKEN = re.compile(r"\S+")
+
+# Десятичное число: без inf/nan, 1_000 и прочего, что понимает float()
+_NUMBER = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?", re.ASCII)
+
+
+class CheckerError(Exception):
+    """Чекер задачи не смог вынести вердикт."""
+
+
+def _trimmed_end(text: str) -> int:
+    # Длина строки без хвостовых пробельных символов, без копии строки
+    end = len(text)
+    while end and text[end - 1].isspace():
+        end -= 1
+    return end
+
+
+def _tokens(text: str) -> Iterator[str]:
+    for match in _TOKEN.finditer(text):
+        yield match.group()
+
+
+def _lines(text: str) -> Iterator[str]:
+    # Непустые строки без хвостовых пробелов
+    start = 0
+    length = len(text)
+    while start < length:
+        end = text.find("\n", start)
+        if end == -1:
+            end = length
+        line = text[start:end].rstrip()
+        if line:
+            yield line
+        start = end + 1
+
+
+def check_exact(test: TestCase, output: str) -> bool:
+    expected = test.expected_output
+    end = _trimmed_end(expected)
+    return _trimmed_end(output) == end and output.startswith(expected[:end])
+
+
+def check_tokens(test: TestCase, output: str) -> bool:
+    actual = _tokens(output)
+    for expected_token in _tokens(test.expected_output):
+        if next(actual, None) != expected_token:
+            return False
+    return next(actual, None) is None
+
+
+def _floats_close(actual: str, expected: str, epsilon: float) -> bool:
+    if actual == expected:
+        return True
+    if not (_NUMBER.fullmatch(actual) and _NUMBER.fullmatch(expected)):
+        return False
+    a, b = float(actual), float(expected)
+    if math.isinf(a) or math.isinf(b):
+        # 1e999 — переполнение, а не число
+        return False
+    # Абсолютная точность для малых чисел, относительная для больших
+    return abs(a - b) <= epsilon * max(1.0, abs(b))
+
+
+def make_float_checker(epsilon: float) -> Check:
+    def check_float(test: TestCase, output: str) -> bool:
+        actual = _tokens(output)
+        for expected_token in _tokens(test.expected_output):
+            token = next(actual, None)
+            if token is None or not _floats_close(token, expected_token, epsilon):
+                return False
+        return next(actual, None) is None
+
+    return check_float
+
+
+def check_lines(test: TestCase, output: str) -> bool:
+    # Мультимножество: повторы строк тоже должны совпасть
+    expected = Counter(_lines(test.expected_output))
+    for line in _lines(output):
+        count = expected.get(line)
+        if not count:
+            return False
+        expected[line] = count - 1
+    return not any(expected.values())
+
+
+BUILTIN_CHECKERS: Dict[str, Check] = {
+    "exact": check_exact,
+    "tokens": check_tokens,
+    "lines": check_lines,
+}
+
+
+def _run_custom_checker(code: str, test: TestCase, output: str) -> bool:
+    """
+    Запускает чекер так же, как решение: python -I checker.py input
+    expected output, в окружении без секретов judge. Код возврата
+    CHECKER_OK — ответ верный, CHECKER_WRONG_ANSWER — неверный.
+
+    Файлы чекера живут только на время его запуска, в своём каталоге:
+    решения запускаются под тем же пользователем, и ожидаемый ответ
+    не должен лежать на диске, пока идёт следующий тест.
+    """
+    with tempfile.TemporaryDirectory(prefix="checker-") as workdir:
+        paths = {}
+        for name, data in (
+            ("checker.py", code),
+            ("input.txt", test.input_data),
+            ("expected.txt", test.expected_output),
+            ("output.txt", output),
+        ):
+            path = os.path.join(workdir, name)
+            with open(path, "w") as f:
+                f.write(data)
+            paths[name] = path
+
+        try:
+            proc = subprocess.run(
+                [
+                    "python",
+                    *SANDBOX_PYTHON_FLAGS,
+                    paths["checker.py"],
+                    paths["input.txt"],
+                    paths["expected.txt"],
+                    paths["output.txt"],
+                ],
+                capture_output=True,
+                text=True,
+                timeout=CHECKER_TIME_LIMIT_SECONDS,
+                cwd=workdir,
+                env=SANDBOX_ENV,
+            )
+        except subprocess.TimeoutExpired as exc:
+            raise CheckerError(f"чекер не уложился в {CHECKER_TIME_LIMIT_SECONDS} с") from exc
+
+    if proc.returncode == CHECKER_OK:
+        return True
+    if proc.returncode == CHECKER_WRONG_ANSWER:
+        return False
+    raise CheckerError(
+        f"чекер завершился с кодом {proc.returncode}: {proc.stderr[-500:]}"
+    )
+
+
+@contextmanager
+def open_checker(spec: CheckerSpec) -> Iterator[Check]:
+    """
+    Функция проверки для чекера задачи.
+    """
+    if spec.kind == "float":
+        yield make_float_checker(spec.epsilon if spec.epsilon is not None else DEFAULT_EPSILON)
+        return
+    if spec.kind != "custom":
+        if spec.kind not in BUILTIN_CHECKERS:
+            logger.warning("Неизвестный чекер %r, сравниваем exact", spec.kind)
+        yield BUILTIN_CHECKERS.get(spec.kind, check_exact)
+        return
+
+    if not (spec.code or "").strip():
+        raise CheckerError("у задачи пустая программа-чекер")
+
+    code = spec.code
+    yield lambda test, output: _run_custom_checker(code, test, output)
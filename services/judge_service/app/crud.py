@@ -1,26 +1,17 @@
-from typing import List, Optional
+import hashlib
+import zlib
+from datetime import datetime, timedelta
+from typing import Collection, List, Optional, Tuple
 from uuid import UUID
 
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 
 from . import models
 
 
-def get_task(db: Session, task_id: int) -> Optional[models.Task]:
-    return db.query(models.Task).filter(models.Task.id == task_id).first()
-
-
-def get_test_cases_for_task(
-    db: Session, task_id: int
-) -> List[models.TestCase]:
-    return (
-        db.query(models.TestCase)
-        .filter(models.TestCase.task_id == task_id)
-        .order_by(models.TestCase.id)
-        .all()
-    )
-
-
 def get_submission_by_id(
     db: Session, submission_id: UUID
 ) -> Optional[models.Submission]:
@@ -31,14 +22,29 @@ def get_submission_by_id(
     )
 
 
+def get_archived_submission(
+    db: Session, submission_id: UUID
+) -> Optional[models.ArchivedSubmission]:
+    return db.get(models.ArchivedSubmission, submission_id)
+
+
 def get_submission_by_idempotency(
     db: Session, task_id: int, idem_key: str
 ) -> Optional[models.Submission]:
+    # created_at из таблицы ключей — поиск только в одной партиции
     return (
         db.query(models.Submission)
+        .join(
+            models.SubmissionIdempotencyKey,
+            (models.SubmissionIdempotencyKey.submission_id == models.Submission.id)
+            & (
+                models.SubmissionIdempotencyKey.submission_created_at
+                == models.Submission.created_at
+            ),
+        )
         .filter(
-            models.Submission.task_id == task_id,
-            models.Submission.idempotency_key == idem_key,
+            models.SubmissionIdempotencyKey.task_id == task_id,
+            models.SubmissionIdempotencyKey.idempotency_key == idem_key,
         )
         .first()
     )
@@ -55,6 +61,32 @@ def list_submissions_by_task(
     )
 
 
+def store_code(db: Session, code: str) -> str:
+    """
+    Кладёт код в code_blobs (если такого ещё нет) и возвращает его хэш.
+    Коммит — на вызывающем.
+    """
+    raw = code.encode("utf-8")
+    code_hash = hashlib.sha256(raw).hexdigest()
+    stmt = (
+        insert(models.CodeBlob.__table__)
+        .values(hash=code_hash, data=zlib.compress(raw), size=len(raw))
+        .on_conflict_do_nothing(index_elements=["hash"])
+    )
+    db.execute(stmt)
+    # Держим строку до коммита: сборщик мусора (partitions.py) не удалит
+    # код, на который вот-вот сошлётся посылка
+    pinned = db.execute(
+        select(models.CodeBlob.hash)
+        .where(models.CodeBlob.hash == code_hash)
+        .with_for_update(key_share=True)
+    ).first()
+    if pinned is None:
+        # Сборщик удалил код между INSERT и SELECT
+        db.execute(stmt)
+    return code_hash
+
+
 def create_submission(
     db: Session,
     task_id: int,
@@ -63,30 +95,358 @@ def create_submission(
     status: str,
     score: int | None,
     idem_key: str | None,
+    user_id: str | None = None,
+    lease_owner: str | None = None,
+    lease_seconds: float = 0,
+    priority: str = "interactive",
+    client_key: str | None = None,
 ) -> models.Submission:
     submission = models.Submission(
         task_id=task_id,
-        code=code,
+        code_hash=store_code(db, code),
         language=language,
         status=status,
         score=score,
         idempotency_key=idem_key,
+        user_id=user_id,
+        priority=priority,
+        client_key=client_key,
     )
+    if lease_owner is not None:
+        submission.lease_owner = lease_owner
+        submission.lease_expires_at = func.now() + timedelta(
+            seconds=lease_seconds
+        )
+        submission.heartbeat_at = func.now()
     db.add(submission)
+    if idem_key is not None:
+        # flush проставляет id и created_at; ключ пишется в той же транзакции
+        db.flush()
+        db.add(
+            models.SubmissionIdempotencyKey(
+                task_id=task_id,
+                idempotency_key=idem_key,
+                submission_id=submission.id,
+                submission_created_at=submission.created_at,
+            )
+        )
     db.commit()
     db.refresh(submission)
     return submission
 
 
-def update_submission_status(
+# --------- Аренда посылок (lease) ---------
+
+ACTIVE_STATUSES = ("QUEUED", "RUNNING")
+
+# Что нужно, чтобы поставить чужую посылку в очередь пода
+QUEUE_COLUMNS = (
+    models.Submission.id,
+    models.Submission.priority,
+    models.Submission.client_key,
+)
+
+
+def claim_submission(
+    db: Session, submission_id: UUID, owner: str
+) -> Optional[models.Submission]:
+    """
+    QUEUED -> RUNNING, только если посылка арендована этим подом.
+    Возвращает None, если посылку уже забрал кто-то другой.
+    """
+    updated = (
+        db.query(models.Submission)
+        .filter(
+            models.Submission.id == submission_id,
+            models.Submission.status == "QUEUED",
+            models.Submission.lease_owner == owner,
+        )
+        .update(
+            {
+                models.Submission.status: "RUNNING",
+                models.Submission.heartbeat_at: func.now(),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if not updated:
+        return None
+    return get_submission_by_id(db, submission_id)
+
+
+def finish_submission(
     db: Session,
     submission: models.Submission,
+    owner: str,
     status: str,
     score: int | None,
-) -> models.Submission:
-    submission.status = status
-    submission.score = score
-    db.add(submission)
+    track_progress: bool = True,
+) -> bool:
+    """
+    Записывает вердикт, снимает аренду и в той же транзакции обновляет
+    прогресс пользователя (кроме ERROR — это не попытка пользователя).
+    Если аренду за это время перехватил другой под, ничего не делает
+    и возвращает False.
+    """
+    updated = (
+        db.query(models.Submission)
+        .filter(
+            models.Submission.id == submission.id,
+            models.Submission.status == "RUNNING",
+            models.Submission.lease_owner == owner,
+        )
+        .update(
+            {
+                models.Submission.status: status,
+                models.Submission.score: score,
+                models.Submission.lease_owner: None,
+                models.Submission.lease_expires_at: None,
+                models.Submission.updated_at: func.now(),
+            },
+            synchronize_session=False,
+        )
+    )
+    if updated and submission.user_id and track_progress and status != "ERROR":
+        upsert_task_progress(
+            db,
+            submission.user_id,
+            submission.task_id,
+            score or 0,
+            status == "PASSED",
+        )
     db.commit()
-    db.refresh(submission)
-    return submission
+    return bool(updated)
+
+
+def upsert_task_progress(
+    db: Session, user_id: str, task_id: int, score: int, solved: bool
+) -> None:
+    """
+    Инкрементально обновляет агрегат user_task_progress одной строкой:
+    лучший балл, число попыток, решена ли задача. Коммит — на вызывающем.
+    """
+    table = models.UserTaskProgress.__table__
+    stmt = insert(table).values(
+        user_id=user_id,
+        task_id=task_id,
+        best_score=score,
+        attempts=1,
+        solved=solved,
+        first_solved_at=func.now() if solved else None,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.task_id],
+        set_={
+            "best_score": func.greatest(
+                table.c.best_score, stmt.excluded.best_score
+            ),
+            "attempts": table.c.attempts + 1,
+            "solved": or_(table.c.solved, stmt.excluded.solved),
+            "first_solved_at": func.coalesce(
+                table.c.first_solved_at, stmt.excluded.first_solved_at
+            ),
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+
+
+def renew_leases(
+    db: Session, owner: str, submission_ids: Collection[UUID], lease_seconds: float
+) -> int:
+    """
+    Heartbeat: одним запросом продлевает аренду посылок, которые под
+    действительно держит (в очереди планировщика или в проверке).
+    Посылка, потерянная по дороге, перестаёт продлеваться, и её
+    подберёт reaper.
+    """
+    if not submission_ids:
+        return 0
+    renewed = (
+        db.query(models.Submission)
+        .filter(
+            models.Submission.id.in_(list(submission_ids)),
+            models.Submission.lease_owner == owner,
+            models.Submission.status.in_(ACTIVE_STATUSES),
+        )
+        .update(
+            {
+                models.Submission.lease_expires_at: func.now()
+                + timedelta(seconds=lease_seconds),
+                models.Submission.heartbeat_at: func.now(),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return renewed
+
+
+def reap_expired_leases(
+    db: Session, owner: str, lease_seconds: float, limit: int
+) -> List[Row]:
+    """
+    Забирает себе посылки, чья аренда истекла (под упал, не успев
+    дойти до вердикта), и возвращает их в QUEUED.
+    SKIP LOCKED — чтобы несколько reaper'ов не брали одно и то же.
+    Возвращает строки (id, priority, client_key).
+    """
+    expired = (
+        db.query(*QUEUE_COLUMNS)
+        .filter(
+            models.Submission.status.in_(ACTIVE_STATUSES),
+            or_(
+                models.Submission.lease_expires_at.is_(None),
+                models.Submission.lease_expires_at < func.now(),
+            ),
+        )
+        .order_by(models.Submission.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    ids = [row.id for row in expired]
+    if not ids:
+        db.rollback()
+        return []
+
+    (
+        db.query(models.Submission)
+        .filter(models.Submission.id.in_(ids))
+        .update(
+            {
+                models.Submission.status: "QUEUED",
+                models.Submission.score: None,
+                models.Submission.lease_owner: owner,
+                models.Submission.lease_expires_at: func.now()
+                + timedelta(seconds=lease_seconds),
+                models.Submission.heartbeat_at: func.now(),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return expired
+
+
+def claim_queued_submissions(
+    db: Session, owner: str, lease_seconds: float, limit: int
+) -> List[Row]:
+    """
+    Забирает себе самые старые посылки в QUEUED у других подов (или
+    ничьи), когда у пода простаивают воркеры. Иначе при всплеске вся
+    очередь осталась бы в памяти принявших её подов, а добавленные
+    автоскейлером поды стояли бы без работы.
+
+    Прежний владелец посылку пропустит: claim_submission сверяет
+    lease_owner. SKIP LOCKED — поды не ждут друг друга на одних строках.
+    Возвращает строки (id, priority, client_key).
+    """
+    rows = (
+        db.query(*QUEUE_COLUMNS)
+        .filter(
+            models.Submission.status == "QUEUED",
+            or_(
+                models.Submission.lease_owner.is_(None),
+                models.Submission.lease_owner != owner,
+            ),
+        )
+        .order_by(models.Submission.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    ids = [row.id for row in rows]
+    if not ids:
+        db.rollback()
+        return []
+
+    (
+        db.query(models.Submission)
+        .filter(
+            models.Submission.id.in_(ids),
+            models.Submission.status == "QUEUED",
+        )
+        .update(
+            {
+                models.Submission.lease_owner: owner,
+                models.Submission.lease_expires_at: func.now()
+                + timedelta(seconds=lease_seconds),
+                models.Submission.heartbeat_at: func.now(),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return rows
+
+
+def get_queue_stats(db: Session) -> Tuple[int, int, Optional[datetime]]:
+    """
+    Глобальное состояние очереди по всем подам:
+    (в очереди, проверяется, created_at самой старой QUEUED-посылки).
+    Обе выборки идут по частичному индексу активных посылок.
+    """
+    queued, oldest = (
+        db.query(
+            func.count(models.Submission.id),
+            func.min(models.Submission.created_at),
+        )
+        .filter(models.Submission.status == "QUEUED")
+        .one()
+    )
+    running = (
+        db.query(func.count(models.Submission.id))
+        .filter(models.Submission.status == "RUNNING")
+        .scalar()
+    )
+    return queued, running, oldest
+
+
+def release_submission(db: Session, submission_id: UUID, owner: str) -> bool:
+    """
+    Возвращает одну свою посылку в очередь с истёкшей арендой.
+    """
+    released = (
+        db.query(models.Submission)
+        .filter(
+            models.Submission.id == submission_id,
+            models.Submission.lease_owner == owner,
+            models.Submission.status.in_(ACTIVE_STATUSES),
+        )
+        .update(
+            {
+                models.Submission.status: "QUEUED",
+                models.Submission.lease_owner: None,
+                models.Submission.lease_expires_at: None,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return bool(released)
+
+
+def release_leases(db: Session, owner: str) -> int:
+    """
+    При остановке пода отдаёт недопроверенные посылки обратно в очередь:
+    аренда сразу считается истёкшей, и их подберёт reaper другого пода.
+    """
+    released = (
+        db.query(models.Submission)
+        .filter(
+            models.Submission.lease_owner == owner,
+            models.Submission.status.in_(ACTIVE_STATUSES),
+        )
+        .update(
+            {
+                models.Submission.status: "QUEUED",
+                models.Submission.lease_owner: None,
+                models.Submission.lease_expires_at: None,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return released
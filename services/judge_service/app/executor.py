@@ -1,9 +1,23 @@
+import atexit
+import io
+import json
+import logging
 import os
+import shutil
+import socket
 import subprocess
 import tempfile
-from typing import List, Tuple
+import threading
+from typing import List, Optional, Sequence, Tuple
 
-from .models import TestCase
+from opentelemetry import trace
+
+from .checkers import Check, open_checker
+from .sandbox import SANDBOX_ENV, SANDBOX_PYTHON_FLAGS
+from .bundles import CheckerSpec, TestCase
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
 
 # Простой лимит времени на один тест
 TIME_LIMIT_SECONDS = 2.0
@@ -11,12 +25,164 @@ TIME_LIMIT_SECONDS = 2.0
 # Все задачи считаем по 100 баллов
 FULL_SCORE = 100
 
+# Модули, которые zygote (zygote.py) импортирует один раз, а тесты
+# получают готовыми через fork. Пусто — без zygote: каждый тест
+# холодным процессом python.
+PRELOAD_MODULES = [
+    name.strip()
+    for name in os.getenv(
+        "JUDGE_PRELOAD_MODULES",
+        "sys,math,collections,itertools,functools,heapq,bisect,re,string,"
+        "random,operator,decimal,fractions,statistics,copy",
+    ).split(",")
+    if name.strip()
+]
+
+# Флаги интерпретатора zygote: -I (см. sandbox.py) и -S — без site
+# (exit/quit zygote возвращает сам). Холодный запуск — только -I:
+# там exit() нужен site.
+ZYGOTE_PYTHON_FLAGS = os.getenv("JUDGE_PYTHON_FLAGS", "-I -S").split()
+COLD_PYTHON_FLAGS = SANDBOX_PYTHON_FLAGS
+
+ZYGOTE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zygote.py")
+
+# Сколько ждём ответа zygote на запуск теста
+ZYGOTE_SPAWN_TIMEOUT_SECONDS = 5.0
+
+
+class ZygoteError(Exception):
+    """zygote не запустился или оборвал соединение."""
+
+
+class ZygoteRun:
+    """
+    Один тест, запущенный через zygote. Закрытие соединения до конца
+    теста zygote понимает как таймаут и убивает процесс.
+    """
+
+    def __init__(self, conn: socket.socket) -> None:
+        self._conn = conn
+        self._reader = conn.makefile("rb")
+        self.returncode: Optional[int] = None
+
+    def _message(self, timeout: float):
+        self._conn.settimeout(timeout)
+        line = self._reader.readline()
+        if not line:
+            raise ZygoteError("zygote закрыл соединение")
+        return json.loads(line)
+
+    def wait_started(self) -> None:
+        message = self._message(ZYGOTE_SPAWN_TIMEOUT_SECONDS)
+        if message != "started":
+            # Ошибка до fork (например, не прочитался файл)
+            self.returncode = message["returncode"]
+
+    def wait(self, timeout: float) -> Optional[int]:
+        """
+        Код возврата теста или None, если не уложился в timeout.
+        """
+        if self.returncode is None:
+            try:
+                self.returncode = self._message(timeout)["returncode"]
+            except socket.timeout:
+                return None
+        return self.returncode
+
+    def close(self) -> None:
+        self._reader.close()
+        self._conn.close()
+
+    def __enter__(self) -> "ZygoteRun":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Zygote:
+    """
+    Процесс-zygote на весь под: стартует лениво, перезапускается,
+    если умер. Запросы от воркеров идут через unix-сокет.
+    """
+
+    def __init__(self, modules: List[str]) -> None:
+        self._modules = modules
+        self._lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._workdir: Optional[str] = None
+        self._socket_path: Optional[str] = None
+
+    def _start(self) -> None:
+        self._cleanup()
+        workdir = tempfile.mkdtemp(prefix="judge-zygote-")
+        socket_path = os.path.join(workdir, "zygote.sock")
+        proc = subprocess.Popen(
+            ["python", *ZYGOTE_PYTHON_FLAGS, ZYGOTE_SCRIPT, socket_path, ",".join(self._modules)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=SANDBOX_ENV,
+            cwd=workdir,
+        )
+        if proc.stdout.readline() != b"ready\n":
+            proc.kill()
+            proc.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise ZygoteError("zygote не запустился")
+        self._proc, self._workdir, self._socket_path = proc, workdir, socket_path
+
+    def _cleanup(self) -> None:
+        if self._proc is not None:
+            # EOF на stdin — zygote убивает свои тесты и выходит
+            self._proc.stdin.close()
+            try:
+                self._proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                self._proc.wait()
+            self._proc = None
+        if self._workdir is not None:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+
+    def spawn(self, path: str, cwd: str, fds: List[int]) -> ZygoteRun:
+        """
+        Запускает файл path в каталоге cwd с fds в роли stdin/stdout/stderr.
+        """
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            socket_path = self._socket_path
+
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.settimeout(ZYGOTE_SPAWN_TIMEOUT_SECONDS)
+            conn.connect(socket_path)
+            socket.send_fds(conn, [json.dumps({"path": path, "cwd": cwd}).encode("utf-8")], fds)
+            run = ZygoteRun(conn)
+            run.wait_started()
+        except (OSError, ValueError) as exc:
+            conn.close()
+            raise ZygoteError(f"zygote: {exc}") from exc
+        return run
+
+    def stop(self) -> None:
+        with self._lock:
+            self._cleanup()
+
+
+zygote = Zygote(PRELOAD_MODULES) if PRELOAD_MODULES else None
+if zygote is not None:
+    atexit.register(zygote.stop)
+
 
 def run_python_code_against_tests(
-    code: str, test_cases: List[TestCase]
+    code: str,
+    test_cases: Sequence[TestCase],
+    checker: CheckerSpec = CheckerSpec(),
 ) -> Tuple[bool, int]:
     """
-    Запускает данный код на всех тестах.
+    Запускает данный код на всех тестах, вывод сверяет чекер задачи.
     Возвращает (все_ли_пройдены, набранный_балл).
     """
 
@@ -24,42 +190,107 @@ def run_python_code_against_tests(
         # Нет тестов — считаем, что всё ок, балл 0 (можно сделать 100, если хочется)
         return True, 0
 
-    with tempfile.NamedTemporaryFile(
-        mode="w", suffix=".py", delete=False
-    ) as tmp:
-        tmp.write(code)
-        tmp_path = tmp.name
-
+    # Свой каталог на посылку, а каждому тесту — пустой рабочий каталог
+    # в нём: решение не видит ни общий /tmp, ни файлы прошлых тестов
+    rundir = tempfile.mkdtemp(prefix="solution-")
     try:
-        all_passed = True
+        path = os.path.join(rundir, "solution.py")
+        with open(path, "w") as f:
+            f.write(code)
 
-        for test in test_cases:
-            try:
-                proc = subprocess.run(
-                    ["python", tmp_path],
-                    input=test.input_data,
-                    capture_output=True,
-                    text=True,
-                    timeout=TIME_LIMIT_SECONDS,
-                )
-            except subprocess.TimeoutExpired:
-                all_passed = False
-                break
-
-            if proc.returncode != 0:
-                all_passed = False
-                break
-
-            stdout = proc.stdout
+        all_passed = True
 
-            if stdout.rstrip() != test.expected_output.rstrip():
-                all_passed = False
-                break
+        with open_checker(checker) as check:
+            for index, test in enumerate(test_cases):
+                with tracer.start_as_current_span(
+                    "executor.test", attributes={"test.index": index}
+                ) as span:
+                    cwd = tempfile.mkdtemp(prefix="cwd-", dir=rundir)
+                    try:
+                        passed = _run_test(path, cwd, test, check)
+                    finally:
+                        shutil.rmtree(cwd, ignore_errors=True)
+                    span.set_attribute("test.passed", passed)
+                if not passed:
+                    all_passed = False
+                    break
 
         score = FULL_SCORE if all_passed else 0
         return all_passed, score
     finally:
+        shutil.rmtree(rundir, ignore_errors=True)
+
+
+def _run_test(path: str, cwd: str, test: TestCase, check: Check) -> bool:
+    """
+    Один тест: запуск процесса, ожидание с лимитом времени, проверка вывода.
+    """
+    if zygote is not None:
+        try:
+            return _run_test_forked(path, cwd, test, check)
+        except ZygoteError:
+            logger.exception("zygote недоступен, запускаем тест отдельным процессом")
+
+    with tracer.start_as_current_span("executor.spawn"):
+        proc = subprocess.Popen(
+            ["python", *COLD_PYTHON_FLAGS, path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=SANDBOX_ENV,
+            cwd=cwd,
+        )
+
+    with tracer.start_as_current_span("executor.run") as span:
         try:
-            os.remove(tmp_path)
-        except OSError:
-            pass
+            stdout, _ = proc.communicate(test.input_data, timeout=TIME_LIMIT_SECONDS)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            span.set_attribute("executor.timeout", True)
+            return False
+        span.set_attribute("process.exit_code", proc.returncode)
+
+    if proc.returncode != 0:
+        return False
+
+    with tracer.start_as_current_span("executor.compare"):
+        return check(test, stdout)
+
+
+def _run_test_forked(path: str, cwd: str, test: TestCase, check: Check) -> bool:
+    """
+    То же через zygote: stdin и stdout теста — временные файлы, их fd
+    уходят в процесс теста.
+    """
+    with tempfile.TemporaryFile() as stdin_file, tempfile.TemporaryFile() as stdout_file, open(
+        os.devnull, "wb"
+    ) as stderr_file:
+        stdin_file.write(test.input_data.encode("utf-8"))
+        stdin_file.flush()
+        stdin_file.seek(0)
+
+        with tracer.start_as_current_span("executor.spawn"):
+            run = zygote.spawn(
+                path, cwd, [stdin_file.fileno(), stdout_file.fileno(), stderr_file.fileno()]
+            )
+
+        with run, tracer.start_as_current_span("executor.run") as span:
+            returncode = run.wait(TIME_LIMIT_SECONDS)
+            if returncode is None:
+                span.set_attribute("executor.timeout", True)
+                return False
+            span.set_attribute("process.exit_code", returncode)
+
+        if returncode != 0:
+            return False
+
+        stdout_file.seek(0)
+        # Как text=True у subprocess: UTF-8 и универсальные переводы строк
+        reader = io.TextIOWrapper(stdout_file, encoding="utf-8", errors="replace")
+        stdout = reader.read()
+        reader.detach()
+
+    with tracer.start_as_current_span("executor.compare"):
+        return check(test, stdout)
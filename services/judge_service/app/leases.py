@@ -0,0 +1,129 @@
+"""
+Аренда посылок между подами judge.
+
+Каждая посылка в статусе QUEUED/RUNNING принадлежит одному поду
+(lease_owner) до lease_expires_at. Фоновый поток пода раз в
+HEARTBEAT_SECONDS продлевает аренду посылок, которые держит его
+планировщик, и заодно:
+- подбирает чужие посылки с истёкшей арендой — так работа упавшего
+  или убитого пода не теряется;
+- если воркеры простаивают, забирает из БД посылки, ждущие в очереди
+  других подов, — так новые поды сразу разбирают накопленную очередь.
+"""
+import logging
+import os
+import socket
+import threading
+
+from . import crud
+from .database import SessionLocal
+from .scheduler import DEFAULT_PRIORITY, PRIORITY_WEIGHTS, Job, Scheduler
+
+logger = logging.getLogger(__name__)
+
+# Идентификатор пода: в Kubernetes HOSTNAME совпадает с именем пода
+POD_ID = os.getenv("HOSTNAME") or socket.gethostname()
+
+# Сколько живёт аренда без продления и как часто её продлеваем
+LEASE_SECONDS = float(os.getenv("JUDGE_LEASE_SECONDS", "30"))
+HEARTBEAT_SECONDS = float(os.getenv("JUDGE_HEARTBEAT_SECONDS", "5"))
+
+# Клиент для подобранных посылок, у которых он не записан (созданы
+# до колонки client_key)
+RECOVERED_CLIENT_ID = "recovered"
+
+
+def _job(row) -> Job:
+    # Чужая посылка встаёт в очередь с тем же приоритетом и от того же
+    # клиента, что и у пода, который её принял
+    return Job(
+        submission_id=row.id,
+        client_id=row.client_key or RECOVERED_CLIENT_ID,
+        priority=row.priority if row.priority in PRIORITY_WEIGHTS else DEFAULT_PRIORITY,
+    )
+
+
+class LeaseKeeper:
+    """
+    Heartbeat + reaper в одном потоке.
+    """
+
+    def __init__(self, scheduler: Scheduler, owner: str = POD_ID) -> None:
+        self.scheduler = scheduler
+        self.owner = owner
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="judge-lease-keeper", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Ошибка heartbeat/reaper")
+            self._stop.wait(HEARTBEAT_SECONDS)
+
+    def tick(self) -> None:
+        db = SessionLocal()
+        try:
+            crud.renew_leases(
+                db, self.owner, self.scheduler.in_flight(), LEASE_SECONDS
+            )
+
+            free = self.scheduler.free_capacity
+            if free <= 0:
+                return
+            recovered = crud.reap_expired_leases(
+                db, self.owner, LEASE_SECONDS, limit=free
+            )
+            for row in recovered:
+                logger.warning(
+                    "Посылка %s осталась без владельца, ставим в очередь заново",
+                    row.id,
+                )
+                self.scheduler.submit(_job(row))
+
+            idle = self.scheduler.idle_workers
+            if idle <= 0:
+                return
+            # С запасом на ещё один круг: до следующего heartbeat
+            # воркеры не должны оставаться без работы
+            claimed = crud.claim_queued_submissions(
+                db,
+                self.owner,
+                LEASE_SECONDS,
+                limit=min(free, idle + self.scheduler.workers),
+            )
+        finally:
+            db.close()
+
+        if claimed:
+            logger.info("Забрали из общей очереди посылок: %s", len(claimed))
+        for row in claimed:
+            self.scheduler.submit(_job(row))
+
+    def release(self) -> None:
+        """
+        Отдаёт все свои недопроверенные посылки другим подам.
+        """
+        db = SessionLocal()
+        try:
+            released = crud.release_leases(db, self.owner)
+        finally:
+            db.close()
+        if released:
+            logger.info("Освобождено посылок при остановке: %s", released)
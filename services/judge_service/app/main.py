@@ -1,28 +1,75 @@
 from __future__ import annotations
 
+import asyncio
+import math
+import os
 import uuid
-from typing import List
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
 
 from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exception_handlers import http_exception_handler
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from uuid import UUID as UUIDType
 
-from . import crud, executor, models, schemas
-from .database import Base, engine, get_db
+from . import crud, models, schemas
+from .database import SessionLocal, dispose_engine, get_db, get_engine, warm_pool
+from .leases import LEASE_SECONDS, POD_ID, LeaseKeeper
+from .responses import NegotiatedResponse
+from .scheduler import DEFAULT_PRIORITY, PRIORITY_WEIGHTS, Job, Scheduler
+from .bundles import CourseServiceError, TestBundle, bundle_cache
+from .tracing import instrument_engine, setup_tracing, shutdown_tracing
+from .worker import process_submission
+
+# Схема submissions ведётся миграциями (migrations/, alembic upgrade head
+# в entrypoint.sh). На импорте приложение в БД не ходит.
+
+# Сколько POST /submissions ждёт вердикта, прежде чем вернуть посылку
+# в статусе QUEUED/RUNNING (дальше клиент опрашивает GET /submissions/{id})
+SUBMIT_WAIT_SECONDS = float(os.getenv("JUDGE_SUBMIT_WAIT_SECONDS", "10"))
+
+# Сколько даём текущим проверкам доработать после SIGTERM.
+# Должно быть меньше terminationGracePeriodSeconds пода.
+DRAIN_SECONDS = float(os.getenv("JUDGE_DRAIN_SECONDS", "20"))
+
+scheduler = Scheduler(process_submission)
+lease_keeper = LeaseKeeper(scheduler)
+
+
+# Выставляется после первой успешной readiness-пробы
+_warmed_up = False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Движок создаётся здесь, но соединения открывает только /readyz
+    # или первый запрос — старт пода от БД не зависит.
+    instrument_engine(get_engine())
+    scheduler.start()
+    lease_keeper.start()
+    yield
+    # uvicorn приходит сюда по SIGTERM, когда HTTP-запросы уже закрыты.
+    # Heartbeat продолжает работать, пока воркеры доделывают проверки.
+    scheduler.stop(timeout=DRAIN_SECONDS)
+    lease_keeper.stop()
+    lease_keeper.release()
+    dispose_engine()
+    shutdown_tracing()
 
-# Создаём таблицу submissions, если её ещё нет.
-# tasks и test_cases уже созданы скриптом course_db.sql,
-# create_all их повторно не тронет.
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Judge Service",
     description="Сервис проверки посылок по задачам курса.",
     version="1.0.0",
+    lifespan=lifespan,
 )
+setup_tracing(app, "judge_service")
 
 
 # --------- Вспомогательные штуки ---------
@@ -45,20 +92,91 @@ async def custom_http_exception_handler(
     # Если detail — наш ErrorResponse, возвращаем его как есть,
     # без обёртки {"detail": ...}
     if isinstance(exc.detail, dict) and "errorId" in exc.detail:
-        return JSONResponse(status_code=exc.status_code, content=exc.detail)
+        return JSONResponse(
+            status_code=exc.status_code,
+            content=exc.detail,
+            headers=exc.headers,
+        )
     return await http_exception_handler(request, exc)
 
 
-def submission_to_schema(submission: models.Submission) -> schemas.Submission:
-    return schemas.Submission(
-        id=str(submission.id),
-        taskId=str(submission.task_id),
-        status=submission.status,  # строка, но Pydantic сам приведёт к Enum
-        score=submission.score,
-        language=submission.language,
-        createdAt=submission.created_at,
-        updatedAt=submission.updated_at,
-    )
+def submission_to_dict(
+    submission: models.Submission | models.ArchivedSubmission,
+) -> dict:
+    # Поля уже в форме schemas.Submission — для списков отдаём как есть,
+    # без повторной валидации Pydantic
+    return {
+        "id": str(submission.id),
+        "taskId": str(submission.task_id),
+        "status": submission.status,
+        "score": submission.score,
+        "language": submission.language,
+        "createdAt": submission.created_at,
+        "updatedAt": submission.updated_at,
+    }
+
+
+def submission_to_schema(
+    submission: models.Submission | models.ArchivedSubmission,
+) -> schemas.Submission:
+    # status — строка, но Pydantic сам приведёт к Enum
+    return schemas.Submission(**submission_to_dict(submission))
+
+
+def client_ip_from_request(request: Request) -> str:
+    """
+    IP, с которого пришли на gateway.
+
+    Начало X-Forwarded-For присылает сам клиент и может подделать,
+    поэтому только то, что выставляет gateway: X-Real-IP ($remote_addr),
+    иначе последний адрес X-Forwarded-For (его дописал ближайший прокси),
+    иначе адрес соединения. judge снаружи доступен только через gateway.
+    """
+    real_ip = request.headers.get("X-Real-IP", "").strip()
+    if real_ip:
+        return real_ip
+    forwarded = request.headers.get("X-Forwarded-For", "").split(",")[-1].strip()
+    if forwarded:
+        return forwarded
+    if request.client:
+        return request.client.host
+    return "anonymous"
+
+
+def client_id_from_request(request: Request, user_id: Optional[str]) -> str:
+    """
+    Кого считать «клиентом» для лимитов и очереди: пользователя из
+    X-User-Id, иначе IP. Без X-User-Id все студенты за одним NAT делили
+    бы один лимит. Подставной X-User-Id на каждый запрос даёт новый
+    лимит клиента, но не обходит общий лимит IP (Scheduler.admit,
+    network_id).
+    """
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{client_ip_from_request(request)}"
+
+
+def require_task(task_id: int) -> TestBundle:
+    """
+    Задача и её тесты из course_service (через кэш): 404, если задачи
+    нет, 503, если course_service недоступен.
+    """
+    try:
+        bundle = bundle_cache.get(task_id)
+    except CourseServiceError:
+        raise HTTPException(
+            status_code=503,
+            detail=build_error(
+                "SERVICE_UNAVAILABLE",
+                "Сервис курсов недоступен, попробуйте позже.",
+            ),
+        )
+    if bundle is None:
+        raise HTTPException(
+            status_code=404,
+            detail=build_error("RESOURCE_NOT_FOUND", "Задача не найдена"),
+        )
+    return bundle
 
 
 # --------- Ручки ---------
@@ -66,26 +184,154 @@ def submission_to_schema(submission: models.Submission) -> schemas.Submission:
 
 @app.get("/healthz")
 def healthz():
+    # Liveness: процесс жив, БД не трогаем
     return {"status": "ok"}
 
 
+@app.get("/readyz")
+def readyz():
+    """
+    Readiness: при первом вызове прогревает пул соединений,
+    дальше только проверяет, что БД отвечает.
+    """
+    global _warmed_up
+    try:
+        if not _warmed_up:
+            warm_pool()
+            _warmed_up = True
+        else:
+            with get_engine().connect() as conn:
+                conn.execute(text("SELECT 1"))
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=503,
+            detail=build_error("NOT_READY", "База данных недоступна"),
+        )
+    return {"status": "ready"}
+
+
+@app.get("/scaling", response_model=schemas.ScalingSignal)
+def scaling_signal(db: Session = Depends(get_db)):
+    """
+    Метрики для автоскейлинга по очереди (см. k8s-judge-autoscaling.yaml).
+    """
+    queued, running, oldest = crud.get_queue_stats(db)
+    oldest_age = 0.0
+    if oldest is not None:
+        now = datetime.now(timezone.utc)
+        oldest_age = max(0.0, (now - oldest).total_seconds())
+
+    local = scheduler.stats()
+    return schemas.ScalingSignal(
+        queueDepth=queued,
+        oldestQueuedAgeSeconds=oldest_age,
+        runningSubmissions=running,
+        localQueueDepth=local.queue_depth,
+        workers=local.workers,
+        busyWorkers=local.busy_workers,
+        workerUtilization=round(local.utilization, 3),
+    )
+
+
 @app.get(
     "/tasks/{task_id}/submissions",
     response_model=List[schemas.Submission],
 )
 def list_submissions_by_task(
     task_id: int,
+    request: Request,
     db: Session = Depends(get_db),
-):
-    task = crud.get_task(db, task_id)
-    if not task:
-        raise HTTPException(
-            status_code=404,
-            detail=build_error("RESOURCE_NOT_FOUND", "Задача не найдена"),
-        )
+) -> Response:
+    require_task(task_id)
 
     submissions = crud.list_submissions_by_task(db, task_id)
-    return [submission_to_schema(s) for s in submissions]
+    # Формат по Accept: JSON (orjson) или application/msgpack
+    return NegotiatedResponse(
+        [submission_to_dict(s) for s in submissions],
+        accept=request.headers.get("accept"),
+    )
+
+
+def _accept_submission(
+    task_id: int,
+    body: schemas.SubmissionCreateRequest,
+    client_id: str,
+    client_ip: str,
+    idem_key: str,
+    user_id: Optional[str],
+    priority: str,
+) -> Tuple[schemas.Submission, Optional[Job]]:
+    """
+    Синхронная часть POST /submissions (course_service, БД, очередь).
+    Возвращает посылку и задание в очереди (None — повтор по ключу
+    идемпотентности).
+    """
+    require_task(task_id)
+
+    db = SessionLocal()
+    try:
+        # Идемпотентность: если уже есть посылка с таким ключом — вернём её
+        existing = crud.get_submission_by_idempotency(db, task_id, idem_key)
+        if existing:
+            return submission_to_schema(existing), None
+
+        # Допуск: лимиты на клиента, его IP и задачу, глубина очереди
+        retry_after = scheduler.admit(client_id, task_id, network_id=client_ip)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=429,
+                detail=build_error(
+                    "TOO_MANY_REQUESTS",
+                    "Слишком много посылок, попробуйте позже.",
+                ),
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+        # Создаём посылку со статусом QUEUED и ставим в очередь
+        submission = crud.create_submission(
+            db=db,
+            task_id=task_id,
+            code=body.code,
+            language=body.language,
+            status="QUEUED",
+            score=None,
+            idem_key=idem_key,
+            user_id=user_id,
+            lease_owner=POD_ID,
+            lease_seconds=LEASE_SECONDS,
+            priority=priority,
+            client_key=client_id,
+        )
+        job = scheduler.submit(
+            Job(
+                submission_id=submission.id,
+                client_id=client_id,
+                priority=priority,
+            )
+        )
+        return submission_to_schema(submission), job
+    finally:
+        db.close()
+
+
+def _load_submission(submission_id: UUIDType) -> Optional[schemas.Submission]:
+    db = SessionLocal()
+    try:
+        submission = crud.get_submission_by_id(db, submission_id)
+        return submission_to_schema(submission) if submission else None
+    finally:
+        db.close()
+
+
+async def _wait_done(job: Job, timeout: float) -> None:
+    # Поток пула не занимаем: воркер планировщика сам будит event loop
+    loop = asyncio.get_running_loop()
+    done = asyncio.Event()
+    job.add_done_callback(lambda: loop.call_soon_threadsafe(done.set))
+    try:
+        await asyncio.wait_for(done.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
 
 
 @app.post(
@@ -93,13 +339,19 @@ def list_submissions_by_task(
     response_model=schemas.Submission,
     status_code=201,
 )
-def create_submission(
+async def create_submission(
     task_id: int,
     body: schemas.SubmissionCreateRequest,
-    db: Session = Depends(get_db),
+    request: Request,
     x_idempotency_key: str = Header(
         ..., alias="X-Idempotency-Key"
     ),
+    x_user_id: Optional[str] = Header(
+        None, alias="X-User-Id", max_length=64
+    ),
+    x_priority: str = Header(
+        DEFAULT_PRIORITY, alias="X-Submission-Priority"
+    ),
 ):
     # Поддерживаем только python
     if body.language.lower() != "python":
@@ -111,45 +363,36 @@ def create_submission(
             ),
         )
 
-    task = crud.get_task(db, task_id)
-    if not task:
+    if x_priority not in PRIORITY_WEIGHTS:
         raise HTTPException(
-            status_code=404,
-            detail=build_error("RESOURCE_NOT_FOUND", "Задача не найдена"),
+            status_code=400,
+            detail=build_error(
+                "UNSUPPORTED_PRIORITY",
+                "Приоритет должен быть одним из: "
+                + ", ".join(PRIORITY_WEIGHTS),
+            ),
         )
 
-    # Идемпотентность: если уже есть посылка с таким ключом — вернём её
-    existing = crud.get_submission_by_idempotency(
-        db, task_id, x_idempotency_key
-    )
-    if existing:
-        return submission_to_schema(existing)
-
-    # Создаём посылку со статусом RUNNING
-    submission = crud.create_submission(
-        db=db,
-        task_id=task_id,
-        code=body.code,
-        language=body.language,
-        status="RUNNING",
-        score=None,
-        idem_key=x_idempotency_key,
+    submission, job = await run_in_threadpool(
+        _accept_submission,
+        task_id,
+        body,
+        client_id_from_request(request, x_user_id),
+        client_ip_from_request(request),
+        x_idempotency_key,
+        x_user_id,
+        x_priority,
     )
+    if job is None:
+        return submission
 
-    # Забираем тесты
-    test_cases = crud.get_test_cases_for_task(db, task_id)
-
-    # Гоним код по тестам
-    passed, score = executor.run_python_code_against_tests(
-        body.code, test_cases
-    )
-    final_status = "PASSED" if passed else "FAILED"
-
-    submission = crud.update_submission_status(
-        db, submission, final_status, score
-    )
-
-    return submission_to_schema(submission)
+    # Обычно проверка укладывается в ожидание и клиент сразу получает
+    # вердикт; под нагрузкой вернём текущий статус. Ожидание не держит
+    # поток пула — иначе всплеск POST занял бы все потоки, и /readyz,
+    # /scaling и GET-запросы встали бы в очередь за ними.
+    await _wait_done(job, SUBMIT_WAIT_SECONDS)
+    current = await run_in_threadpool(_load_submission, job.submission_id)
+    return current or submission
 
 
 @app.get(
@@ -161,6 +404,9 @@ def get_submission(
     db: Session = Depends(get_db),
 ):
     submission = crud.get_submission_by_id(db, submission_id)
+    if not submission:
+        # Старые посылки уезжают в архив вместе с партицией
+        submission = crud.get_archived_submission(db, submission_id)
     if not submission:
         raise HTTPException(
             status_code=404,
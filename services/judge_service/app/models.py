@@ -1,4 +1,6 @@
 import uuid
+import zlib
+from datetime import datetime, timezone
 
 from sqlalchemy import (
     BigInteger,
@@ -6,41 +8,41 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
     Text,
-    UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import deferred, relationship
 
 from .database import Base
 
 
-class Task(Base):
-    __tablename__ = "tasks"
-
-    id = Column(BigInteger, primary_key=True, index=True)
-    module_id = Column(BigInteger, nullable=True)
-    title = Column(String(255), nullable=False)
-    description = Column(Text, nullable=False)
-    language = Column(String(50), nullable=False, server_default="python")
-    is_free = Column(Boolean, nullable=False, server_default="false")
-    order_index = Column(Integer, nullable=False, server_default="1")
-
+class CodeBlob(Base):
+    """
+    Исходники посылок, адресуемые по содержимому: sha256 -> zlib(код).
+    Одинаковый код хранится один раз, сколько бы посылок на него
+    ни ссылалось.
+    """
 
-class TestCase(Base):
-    __tablename__ = "test_cases"
+    __tablename__ = "code_blobs"
 
-    id = Column(BigInteger, primary_key=True, index=True)
-    task_id = Column(
-        BigInteger,
-        ForeignKey("tasks.id", ondelete="CASCADE"),
+    hash = Column(String(64), primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(
+        DateTime(timezone=True),
         nullable=False,
-        index=True,
+        server_default=func.now(),
     )
-    input_data = Column(Text, nullable=False)
-    expected_output = Column(Text, nullable=False)
+
+    @property
+    def code(self) -> str:
+        return zlib.decompress(self.data).decode("utf-8")
 
 
 class Submission(Base):
@@ -48,18 +50,41 @@ class Submission(Base):
     Таблица для посылок.
 
     Имена и поля подобраны под схемы из course_api.yaml:
-    - status: QUEUED / RUNNING / PASSED / FAILED
+    - status: QUEUED / RUNNING / PASSED / FAILED / ERROR
     - score: int или null
     - language: строка
+
+    lease_owner / lease_expires_at — какой под сейчас отвечает за
+    посылку в статусе QUEUED/RUNNING и до какого момента. Под продлевает
+    аренду heartbeat'ом; посылки с истёкшей арендой подбирает reaper.
+    priority и client_key — место посылки в очереди (scheduler.Job):
+    под, забравший чужую посылку, ставит её с тем же приоритетом и от
+    того же клиента.
+
+    Код лежит в code_blobs (code_hash). Старые посылки хранят его прямо
+    в колонке code — свойство code читает из нужного места.
+
+    Задачи и тесты принадлежат course_service (см. bundles.py):
+    task_id здесь без ForeignKey в модели, внешний ключ есть только в БД.
+
+    Таблица партиционирована по месяцам created_at (см. partitions.py),
+    поэтому created_at входит в первичный ключ. Уникальность
+    idempotency_key держит отдельная таблица submission_idempotency_keys.
     """
 
     __tablename__ = "submissions"
     __table_args__ = (
-        UniqueConstraint(
+        Index(
+            "ix_submissions_task_id_created_at",
             "task_id",
-            "idempotency_key",
-            name="uq_submissions_task_id_idem_key",
+            "created_at",
+        ),
+        Index(
+            "ix_submissions_active_lease",
+            "lease_expires_at",
+            postgresql_where=text("status IN ('QUEUED', 'RUNNING')"),
         ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
     id = Column(
@@ -67,20 +92,31 @@ class Submission(Base):
         primary_key=True,
         default=uuid.uuid4,
     )
-    task_id = Column(
-        BigInteger,
-        ForeignKey("tasks.id", ondelete="CASCADE"),
-        nullable=False,
+    task_id = Column(BigInteger, nullable=False)
+    code_hash = Column(
+        String(64),
+        ForeignKey("code_blobs.hash"),
+        nullable=True,
         index=True,
     )
-    code = Column(Text, nullable=False)
+    # Колонка code осталась для посылок до code_blobs
+    inline_code = deferred(Column("code", Text, nullable=True))
     language = Column(String(50), nullable=False)
     status = Column(String(20), nullable=False)
     score = Column(Integer, nullable=True)
     idempotency_key = Column(String(64), nullable=True)
+    user_id = Column(String(64), nullable=True)
+    priority = Column(String(16), nullable=False, server_default="interactive")
+    client_key = Column(String(80), nullable=True)
+    lease_owner = Column(String(64), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    # Ключ партиции: проставляем на стороне приложения, чтобы он был
+    # известен до INSERT (нужен для submission_idempotency_keys)
     created_at = Column(
         DateTime(timezone=True),
-        nullable=False,
+        primary_key=True,
+        default=lambda: datetime.now(timezone.utc),
         server_default=func.now(),
     )
     updated_at = Column(
@@ -89,3 +125,66 @@ class Submission(Base):
         server_default=func.now(),
         onupdate=func.now(),
     )
+
+    blob = relationship(CodeBlob, lazy="select")
+
+    @property
+    def code(self) -> str:
+        if self.code_hash is not None:
+            return self.blob.code
+        return self.inline_code
+
+
+class SubmissionIdempotencyKey(Base):
+    """
+    (task_id, idempotency_key) -> посылка. На партиционированной
+    submissions глобальный UNIQUE без created_at невозможен, поэтому
+    уникальность ключа держит эта таблица. submission_created_at
+    позволяет искать посылку сразу в нужной партиции.
+    """
+
+    __tablename__ = "submission_idempotency_keys"
+
+    task_id = Column(BigInteger, primary_key=True)
+    idempotency_key = Column(String(64), primary_key=True)
+    submission_id = Column(UUID(as_uuid=True), nullable=False)
+    submission_created_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class ArchivedSubmission(Base):
+    """
+    Посылки из выгруженных в архив партиций: только поля ответа
+    GET /submissions/{id} и имя файла архива с полной строкой.
+    """
+
+    __tablename__ = "submission_archive"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    task_id = Column(BigInteger, nullable=False)
+    language = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False)
+    score = Column(Integer, nullable=True)
+    archive_file = Column(String(255), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class UserTaskProgress(Base):
+    """
+    Агрегат прогресса пользователя по задаче. Таблицу создаёт миграция
+    course_service, judge обновляет её при каждом вердикте.
+    """
+
+    __tablename__ = "user_task_progress"
+
+    user_id = Column(String(64), primary_key=True)
+    task_id = Column(BigInteger, primary_key=True)
+    best_score = Column(Integer, nullable=False, server_default="0")
+    attempts = Column(Integer, nullable=False, server_default="0")
+    solved = Column(Boolean, nullable=False, server_default="false")
+    first_solved_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
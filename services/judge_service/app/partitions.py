@@ -0,0 +1,317 @@
+"""
+Помесячные партиции submissions и выгрузка старых в архив.
+
+submissions партиционирована по created_at: одна партиция
+submissions_YYYY_MM на календарный месяц (UTC) плюс submissions_default
+на случай, если нужной партиции ещё нет.
+
+- ensure: создаёт партиции на текущий и PARTITIONS_AHEAD следующих
+  месяцев, а также на каждый месяц, строки которого лежат в
+  submissions_default (и переносит их туда) — иначе они никогда не
+  попали бы в архив. Вызывается при старте пода (entrypoint.sh) и из
+  архивации.
+- archive: партиции старше ARCHIVE_AFTER_MONTHS целиком выгружаются
+  в ARCHIVE_DIR/<партиция>.jsonl.gz, поля ответа API переносятся в
+  submission_archive (для GET /submissions/{id}), партиция
+  отсоединяется и удаляется. Код посылок пишется в архив из
+  code_blobs; после архивации из code_blobs удаляется код, на который
+  больше не ссылается ни одна посылка.
+
+Запуск: python -m app.partitions ensure|archive
+"""
+import argparse
+import gzip
+import logging
+import os
+import re
+import zlib
+from datetime import date
+from pathlib import Path
+from typing import List
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, dispose_engine, get_engine
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_AHEAD = int(os.getenv("JUDGE_PARTITIONS_AHEAD", "3"))
+ARCHIVE_AFTER_MONTHS = int(os.getenv("JUDGE_ARCHIVE_AFTER_MONTHS", "6"))
+ARCHIVE_DIR = os.getenv("JUDGE_ARCHIVE_DIR", "/var/lib/judge/archive")
+
+# Строк на одну выборку при выгрузке партиции и на один проход
+# сборки мусора в code_blobs
+ARCHIVE_FETCH_ROWS = 1000
+
+# Поды и CronJob создают партиции по очереди
+PARTITION_LOCK_KEY = 7_301_003
+
+PARTITION_RE = re.compile(r"^submissions_(\d{4})_(\d{2})$")
+
+# Код старых посылок лежит в колонке code, новых — в code_blobs
+ARCHIVE_COLUMNS = (
+    "s.id, s.task_id, s.code_hash, s.code, b.data AS code_blob, s.language, "
+    "s.status, s.score, s.idempotency_key, s.user_id, s.created_at, s.updated_at"
+)
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"submissions_{month:%Y_%m}"
+
+
+def _bounds(month: date) -> str:
+    return (
+        f"FROM ('{month:%Y-%m-%d} 00:00:00+00') "
+        f"TO ('{add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+    )
+
+
+def _range_params(month: date) -> dict:
+    return {
+        "start": f"{month:%Y-%m-%d} 00:00:00+00",
+        "end": f"{add_months(month, 1):%Y-%m-%d} 00:00:00+00",
+    }
+
+
+def list_partitions(db: Session) -> List[date]:
+    rows = db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'submissions'::regclass"
+        )
+    ).scalars()
+    months = []
+    for name in rows:
+        match = PARTITION_RE.match(name)
+        if match:
+            months.append(date(int(match[1]), int(match[2]), 1))
+    return sorted(months)
+
+
+def create_partition(db: Session, month: date) -> None:
+    """
+    Создаёт партицию месяца. Если строки этого месяца уже попали в
+    submissions_default, переносит их в новую партицию. Коммит — на
+    вызывающем.
+    """
+    name = partition_name(month)
+    in_default = db.execute(
+        text(
+            "SELECT 1 FROM submissions_default "
+            "WHERE created_at >= :start AND created_at < :end LIMIT 1"
+        ),
+        _range_params(month),
+    ).first()
+    if in_default is None:
+        db.execute(text(f"CREATE TABLE {name} PARTITION OF submissions FOR VALUES {_bounds(month)}"))
+        return
+
+    db.execute(text(f"CREATE TABLE {name} (LIKE submissions INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(
+        text(
+            f"WITH moved AS (DELETE FROM submissions_default "
+            f"WHERE created_at >= :start AND created_at < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        _range_params(month),
+    )
+    db.execute(text(f"ALTER TABLE submissions ATTACH PARTITION {name} FOR VALUES {_bounds(month)}"))
+
+
+def default_partition_months(db: Session) -> List[date]:
+    """
+    Месяцы, строки которых лежат в submissions_default. Обычно она
+    пуста: туда попадают только посылки, созданные раньше ensure.
+    """
+    rows = db.execute(
+        text(
+            "SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::date "
+            "FROM submissions_default"
+        )
+    ).scalars()
+    return sorted(rows)
+
+
+def ensure_partitions(db: Session, months_ahead: int = PARTITIONS_AHEAD) -> List[str]:
+    """
+    Партиции на текущий и months_ahead следующих месяцев и на месяцы
+    из submissions_default. Возвращает имена созданных.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+    existing = set(list_partitions(db))
+    current = month_start(date.today())
+    months = {add_months(current, i) for i in range(months_ahead + 1)}
+    months.update(default_partition_months(db))
+    created = []
+    for month in sorted(months):
+        if month in existing:
+            continue
+        create_partition(db, month)
+        created.append(partition_name(month))
+    db.commit()
+    return created
+
+
+def _export_partition(db: Session, name: str, path: Path) -> int:
+    """
+    Пишет все строки партиции в gzip JSON Lines. Файл появляется под
+    итоговым именем только целиком.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    count = 0
+    result = db.execute(
+        text(
+            f"SELECT {ARCHIVE_COLUMNS} FROM {name} s "
+            f"LEFT JOIN code_blobs b ON b.hash = s.code_hash "
+            f"ORDER BY s.created_at"
+        ).execution_options(yield_per=ARCHIVE_FETCH_ROWS)
+    )
+    with gzip.open(tmp, "wb") as out:
+        for row in result.mappings():
+            item = dict(row)
+            blob = item.pop("code_blob")
+            if item["code"] is None and blob is not None:
+                item["code"] = zlib.decompress(blob).decode("utf-8")
+            out.write(orjson.dumps(item))
+            out.write(b"\n")
+            count += 1
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return count
+
+
+def archive_partitions(
+    db: Session,
+    after_months: int = ARCHIVE_AFTER_MONTHS,
+    archive_dir: str = ARCHIVE_DIR,
+) -> List[str]:
+    """
+    Выгружает и удаляет партиции целиком старше after_months месяцев.
+    Возвращает имена выгруженных.
+    """
+    cutoff = add_months(month_start(date.today()), -after_months)
+    directory = Path(archive_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    archived = []
+    for month in list_partitions(db):
+        if month >= cutoff:
+            break
+        name = partition_name(month)
+        active = db.execute(
+            text(f"SELECT 1 FROM {name} WHERE status IN ('QUEUED', 'RUNNING') LIMIT 1")
+        ).first()
+        if active is not None:
+            logger.warning("В партиции %s есть недопроверенные посылки, пропускаем", name)
+            db.rollback()
+            continue
+
+        path = directory / f"{name}.jsonl.gz"
+        rows = _export_partition(db, name, path)
+
+        # Файл уже на диске: если упадём дальше, следующий запуск
+        # просто перезапишет его
+        db.execute(
+            text(
+                f"INSERT INTO submission_archive "
+                f"(id, task_id, language, status, score, archive_file, created_at, updated_at) "
+                f"SELECT id, task_id, language, status, score, :file, created_at, updated_at "
+                f"FROM {name} ON CONFLICT (id) DO NOTHING"
+            ),
+            {"file": path.name},
+        )
+        # Повтор запроса с ключом идемпотентности спустя месяцы — уже
+        # не повтор, ключи архивных посылок не держим
+        db.execute(
+            text(
+                "DELETE FROM submission_idempotency_keys "
+                "WHERE submission_created_at >= :start AND submission_created_at < :end"
+            ),
+            _range_params(month),
+        )
+        db.execute(text(f"ALTER TABLE submissions DETACH PARTITION {name}"))
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+
+        logger.info("Партиция %s выгружена в %s (%s строк)", name, path, rows)
+        archived.append(name)
+    return archived
+
+
+def collect_code_blobs(db: Session, batch: int = ARCHIVE_FETCH_ROWS) -> int:
+    """
+    Удаляет из code_blobs код, на который не ссылается ни одна посылка
+    (их партиции ушли в архив). Возвращает число удалённых.
+
+    crud.store_code держит FOR KEY SHARE на код до коммита посылки,
+    SKIP LOCKED такие строки пропускает. Если посылка с этим кодом
+    успела закоммититься между выборкой и удалением, внешний ключ
+    откатит пачку — её код удалится при следующем запуске.
+    """
+    deleted = 0
+    after = ""
+    while True:
+        hashes = list(
+            db.execute(
+                text("SELECT hash FROM code_blobs WHERE hash > :after ORDER BY hash LIMIT :limit"),
+                {"after": after, "limit": batch},
+            ).scalars()
+        )
+        if not hashes:
+            break
+        after = hashes[-1]
+        try:
+            deleted += db.execute(
+                text(
+                    "DELETE FROM code_blobs WHERE hash IN ("
+                    "SELECT b.hash FROM code_blobs b WHERE b.hash = ANY(:hashes) "
+                    "AND NOT EXISTS (SELECT 1 FROM submissions s WHERE s.code_hash = b.hash) "
+                    "FOR UPDATE SKIP LOCKED)"
+                ),
+                {"hashes": hashes},
+            ).rowcount
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            logger.warning("Код из code_blobs снова используется, пропускаем пачку")
+    return deleted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["ensure", "archive"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    get_engine()
+    db = SessionLocal()
+    try:
+        created = ensure_partitions(db)
+        if created:
+            logger.info("Созданы партиции: %s", ", ".join(created))
+        if args.command == "archive":
+            archive_partitions(db)
+            deleted = collect_code_blobs(db)
+            if deleted:
+                logger.info("Удалено неиспользуемого кода из code_blobs: %s", deleted)
+    finally:
+        db.close()
+        dispose_engine()
+
+
+if __name__ == "__main__":
+    main()
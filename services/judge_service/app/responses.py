@@ -0,0 +1,108 @@
+"""
+Ответ с выбором формата по Accept.
+
+Один и тот же класс лежит в course_service (app/core/responses.py)
+и judge_service (app/responses.py) — у сервисов раздельные образы.
+"""
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Any, Mapping, Optional
+from uuid import UUID
+
+import msgpack
+import orjson
+from starlette.responses import Response
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_ALIASES = {MSGPACK_MEDIA_TYPE, "application/x-msgpack"}
+
+
+def _quality(params) -> float:
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                q = float(value.strip())
+            except ValueError:
+                return 0.0
+            return q if 0.0 <= q <= 1.0 else 0.0
+    return 1.0
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """
+    True, если клиент явно просит msgpack и ставит его не ниже JSON.
+
+    Качество JSON берётся из самого точного совпадения: application/json,
+    иначе application/*, иначе */*. При равных q выигрывает msgpack —
+    клиент назвал его явно.
+    """
+    if not accept:
+        return False
+    msgpack_q = 0.0
+    # Точность совпадения -> q: 2 — application/json, 1 — application/*, 0 — */*
+    json_q = {}
+    for part in accept.split(","):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        media_type = media_type.lower()
+        q = _quality(params)
+        if media_type in _MSGPACK_ALIASES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type == JSON_MEDIA_TYPE:
+            json_q[2] = max(json_q.get(2, 0.0), q)
+        elif media_type == "application/*":
+            json_q[1] = max(json_q.get(1, 0.0), q)
+        elif media_type == "*/*":
+            json_q[0] = max(json_q.get(0, 0.0), q)
+    if msgpack_q <= 0.0:
+        return False
+    if not json_q:
+        return True
+    return msgpack_q >= json_q[max(json_q)]
+
+
+def _msgpack_default(obj: Any) -> Any:
+    # Те же представления, что даёт orjson в JSON
+    if isinstance(obj, datetime):
+        value = obj.isoformat()
+        if obj.utcoffset() == timedelta(0):
+            # Как OPT_UTC_Z и Pydantic: "Z" вместо "+00:00"
+            value = value[:-6] + "Z"
+        return value
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Type is not msgpack serializable: {type(obj).__name__}")
+
+
+class NegotiatedResponse(Response):
+    """
+    Отдаёт уже готовые dict/list без повторной валидации Pydantic:
+    application/msgpack, если клиент его просит, иначе JSON через orjson.
+    """
+
+    media_type = JSON_MEDIA_TYPE
+
+    def __init__(
+        self,
+        content: Any,
+        accept: Optional[str] = None,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        media_type = MSGPACK_MEDIA_TYPE if wants_msgpack(accept) else JSON_MEDIA_TYPE
+        self.media_type = media_type
+        super().__init__(content, status_code=status_code, headers=headers, media_type=media_type)
+        # Формат зависит от Accept — кэши (nginx proxy_cache) должны это учитывать
+        self.headers["Vary"] = "Accept"
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == MSGPACK_MEDIA_TYPE:
+            return msgpack.packb(content, default=_msgpack_default, use_bin_type=True)
+        # OPT_UTC_Z — даты в UTC как у ответов через response_model
+        # (Pydantic): списки и одиночные GET пишут одно и то же
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
@@ -0,0 +1,11 @@
+"""
+Запуск чужого кода: решений (executor.py) и программ-чекеров
+(checkers.py).
+"""
+import os
+
+# Окружение процессов с чужим кодом: без DATABASE_URL и прочего из judge
+SANDBOX_ENV = {"PATH": os.environ.get("PATH", os.defpath), "LANG": "C.UTF-8"}
+
+# -I — без PYTHON* из окружения, user site и каталога скрипта в sys.path
+SANDBOX_PYTHON_FLAGS = ["-I"]
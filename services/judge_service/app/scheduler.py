@@ -0,0 +1,393 @@
+"""
+Планировщик проверки посылок.
+
+Стоит перед executor'ом и отвечает за три вещи:
+- допуск (admission control): token bucket на клиента, на его сеть
+  (IP) и на задачу;
+- backpressure: если очередь переполнена, новые посылки отбиваются 429;
+- справедливую очередь: посылки разных клиентов чередуются с учётом
+  приоритета, так что один клиент не может занять всех воркеров.
+
+Состояние живёт в памяти процесса, то есть лимиты и очередь — на под.
+"""
+import heapq
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+from opentelemetry.context import Context
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+# Сколько посылок проверяется одновременно
+WORKERS = int(os.getenv("JUDGE_WORKERS", "2"))
+
+# Глубина очереди, после которой начинаем отвечать 429
+MAX_QUEUE_DEPTH = int(os.getenv("JUDGE_MAX_QUEUE_DEPTH", "100"))
+
+# Лимиты: rate — посылок в секунду, burst — сколько можно прислать разом
+CLIENT_RATE = float(os.getenv("JUDGE_CLIENT_RATE", "0.5"))
+CLIENT_BURST = float(os.getenv("JUDGE_CLIENT_BURST", "5"))
+TASK_RATE = float(os.getenv("JUDGE_TASK_RATE", "5"))
+TASK_BURST = float(os.getenv("JUDGE_TASK_BURST", "50"))
+# Общий лимит на IP: за одним NAT много студентов, но и подставной
+# X-User-Id на каждый запрос не даст больше этого
+NETWORK_RATE = float(os.getenv("JUDGE_NETWORK_RATE", "5"))
+NETWORK_BURST = float(os.getenv("JUDGE_NETWORK_BURST", "50"))
+
+# Веса приоритетов: interactive-посылки обслуживаются в 4 раза чаще,
+# чем массовая перепроверка.
+PRIORITY_WEIGHTS: Dict[str, int] = {"interactive": 4, "bulk": 1}
+DEFAULT_PRIORITY = "interactive"
+
+# Сколько ключей (клиентов/задач) держим в памяти
+MAX_TRACKED_KEYS = 10_000
+
+# Окно сглаживания загрузки воркеров, секунды
+UTILIZATION_WINDOW_SECONDS = 30.0
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.updated)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """
+        Сколько секунд ждать до появления жетона (0 — жетон есть).
+        """
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """
+    Набор token bucket'ов по ключу. Старые ключи вытесняются по LRU.
+    """
+
+    def __init__(
+        self, rate: float, burst: float, max_keys: int = MAX_TRACKED_KEYS
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def bucket(self, key: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+
+@dataclass
+class Job:
+    submission_id: UUID
+    client_id: str
+    priority: str = DEFAULT_PRIORITY
+    enqueued_at: float = field(default_factory=time.monotonic)
+    done: threading.Event = field(default_factory=threading.Event)
+    # Контекст трассировки того, кто поставил посылку в очередь
+    trace_context: Context = field(default_factory=otel_context.get_current)
+    _callbacks: List[Callable[[], None]] = field(default_factory=list, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def add_done_callback(self, callback: Callable[[], None]) -> None:
+        """
+        callback вызывается из потока воркера, когда проверка закончится,
+        или сразу, если она уже закончилась.
+        """
+        with self._lock:
+            if not self.done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def finish(self) -> None:
+        with self._lock:
+            self.done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Ошибка в callback посылки %s", self.submission_id)
+
+
+@dataclass
+class SchedulerStats:
+    queue_depth: int
+    oldest_queued_age_seconds: float
+    workers: int
+    busy_workers: int
+    utilization: float
+
+
+@dataclass(order=True)
+class _Entry:
+    finish: float
+    seq: int
+    start: float = field(compare=False)
+    job: Job = field(compare=False)
+
+
+class Scheduler:
+    """
+    Weighted fair queueing поверх пула потоков.
+
+    Поток (flow) — пара (клиент, приоритет). Каждой посылке назначается
+    виртуальное время окончания start + 1/weight, где start не меньше
+    окончания предыдущей посылки того же потока. Воркеры берут посылку
+    с наименьшим временем окончания, поэтому десять посылок одного
+    клиента не задерживают одну посылку другого.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[UUID], None],
+        workers: int = WORKERS,
+        max_queue_depth: int = MAX_QUEUE_DEPTH,
+    ) -> None:
+        self._handler = handler
+        self._workers = workers
+        self._max_queue_depth = max_queue_depth
+
+        self._cond = threading.Condition()
+        self._heap: List[_Entry] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[Tuple[str, str], float] = {}
+
+        self._client_limiter = RateLimiter(CLIENT_RATE, CLIENT_BURST)
+        self._task_limiter = RateLimiter(TASK_RATE, TASK_BURST)
+        self._network_limiter = RateLimiter(NETWORK_RATE, NETWORK_BURST)
+
+        self._threads: List[threading.Thread] = []
+        self._running = False
+        self._busy = 0
+        # Посылки, которые сейчас проверяют воркеры
+        self._in_progress: Set[UUID] = set()
+        # Загрузка воркеров (0..1), экспоненциально сглаженная по времени
+        self._utilization = 0.0
+        self._utilization_at = time.monotonic()
+        # Скользящее среднее времени проверки одной посылки, секунды
+        self._avg_run_seconds = 1.0
+
+    # --------- Допуск ---------
+
+    def admit(self, client_id: str, task_id: int, network_id: Optional[str] = None) -> float:
+        """
+        Пытается принять посылку. Возвращает 0, если посылка принята
+        (жетоны списаны), иначе — сколько секунд клиенту стоит подождать.
+        network_id — IP клиента, если client_id его не включает.
+        """
+        with self._cond:
+            if not self._running or len(self._heap) >= self._max_queue_depth:
+                return self._queue_retry_after()
+
+            now = time.monotonic()
+            buckets = [
+                self._client_limiter.bucket(client_id, now),
+                self._task_limiter.bucket(str(task_id), now),
+            ]
+            if network_id is not None:
+                buckets.append(self._network_limiter.bucket(network_id, now))
+            wait = max(bucket.wait_time(now) for bucket in buckets)
+            if wait > 0:
+                return wait
+
+            for bucket in buckets:
+                bucket.take()
+            return 0.0
+
+    def _queue_retry_after(self) -> float:
+        # Сколько времени нужно, чтобы очередь опустилась ниже порога
+        excess = len(self._heap) - self._max_queue_depth + 1
+        return max(1.0, excess * self._avg_run_seconds / max(1, self._workers))
+
+    # --------- Очередь ---------
+
+    def submit(self, job: Job) -> Job:
+        weight = PRIORITY_WEIGHTS.get(job.priority, 1)
+        flow = (job.client_id, job.priority)
+        with self._cond:
+            start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+            finish = start + 1.0 / weight
+            self._last_finish[flow] = finish
+            heapq.heappush(
+                self._heap, _Entry(finish, next(self._seq), start, job)
+            )
+            self._cond.notify()
+        return job
+
+    def _next_job(self) -> Optional[Job]:
+        with self._cond:
+            while self._running and not self._heap:
+                self._cond.wait()
+            if not self._running:
+                return None
+            entry = heapq.heappop(self._heap)
+            self._virtual_time = max(self._virtual_time, entry.start)
+            if not self._heap:
+                # Очередь опустела — история потоков больше не нужна
+                self._last_finish.clear()
+                self._virtual_time = 0.0
+            self._update_utilization()
+            self._busy += 1
+            self._in_progress.add(entry.job.submission_id)
+            return entry.job
+
+    def _worker_loop(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            started = time.monotonic()
+            token = otel_context.attach(job.trace_context)
+            try:
+                # Ожидание в очереди — задним числом, от постановки до сейчас
+                waited_ns = int((started - job.enqueued_at) * 1e9)
+                tracer.start_span(
+                    "scheduler.queue_wait",
+                    start_time=time.time_ns() - waited_ns,
+                    attributes={
+                        "submission.id": str(job.submission_id),
+                        "submission.priority": job.priority,
+                    },
+                ).end()
+                with tracer.start_as_current_span(
+                    "judge.process_submission",
+                    attributes={"submission.id": str(job.submission_id)},
+                ):
+                    self._handler(job.submission_id)
+            except Exception:
+                logger.exception(
+                    "Ошибка при проверке посылки %s", job.submission_id
+                )
+            finally:
+                otel_context.detach(token)
+                elapsed = time.monotonic() - started
+                with self._cond:
+                    self._update_utilization()
+                    self._busy -= 1
+                    self._in_progress.discard(job.submission_id)
+                    self._avg_run_seconds = (
+                        0.8 * self._avg_run_seconds + 0.2 * elapsed
+                    )
+                job.finish()
+
+    # --------- Метрики ---------
+
+    def _update_utilization(self) -> None:
+        # Вызывается под self._cond перед каждым изменением self._busy
+        now = time.monotonic()
+        decay = math.exp(
+            -(now - self._utilization_at) / UTILIZATION_WINDOW_SECONDS
+        )
+        current = self._busy / max(1, self._workers)
+        self._utilization = self._utilization * decay + current * (1 - decay)
+        self._utilization_at = now
+
+    def stats(self) -> SchedulerStats:
+        with self._cond:
+            self._update_utilization()
+            now = time.monotonic()
+            oldest = min(
+                (entry.job.enqueued_at for entry in self._heap), default=now
+            )
+            return SchedulerStats(
+                queue_depth=len(self._heap),
+                oldest_queued_age_seconds=now - oldest,
+                workers=self._workers,
+                busy_workers=self._busy,
+                utilization=self._utilization,
+            )
+
+    # --------- Жизненный цикл ---------
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        for i in range(self._workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f"judge-worker-{i}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Останавливает воркеры: новые посылки из очереди не берутся,
+        текущие проверки дорабатывают не дольше timeout секунд.
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            remaining = (
+                None if deadline is None
+                else max(0.0, deadline - time.monotonic())
+            )
+            thread.join(remaining)
+        self._threads = [t for t in self._threads if t.is_alive()]
+
+    def in_flight(self) -> Set[UUID]:
+        """
+        Посылки пода: ждут в очереди или проверяются прямо сейчас.
+        """
+        with self._cond:
+            return {entry.job.submission_id for entry in self._heap} | self._in_progress
+
+    @property
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def idle_workers(self) -> int:
+        """
+        Воркеры, которым не достанется работы из локальной очереди.
+        """
+        with self._cond:
+            return max(0, self._workers - self._busy - len(self._heap))
+
+    @property
+    def free_capacity(self) -> int:
+        with self._cond:
+            return max(0, self._max_queue_depth - len(self._heap))
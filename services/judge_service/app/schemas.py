@@ -12,6 +12,8 @@ class SubmissionStatus(str, Enum):
     RUNNING = "RUNNING"
     PASSED = "PASSED"
     FAILED = "FAILED"
+    # Внутренняя ошибка judge (например, сломанный чекер), не вердикт
+    ERROR = "ERROR"
 
 
 class SubmissionCreateRequest(BaseModel):
@@ -34,6 +36,27 @@ class Submission(BaseModel):
     updatedAt: Optional[datetime] = None
 
 
+class ScalingSignal(BaseModel):
+    """
+    Сигнал для автоскейлинга. queue* — глобально по всем подам (из БД),
+    local*/workers* — по текущему поду.
+    """
+
+    queueDepth: int = Field(..., description="Посылок в статусе QUEUED")
+    oldestQueuedAgeSeconds: float = Field(
+        ..., description="Сколько ждёт самая старая посылка в очереди"
+    )
+    runningSubmissions: int = Field(
+        ..., description="Посылок в статусе RUNNING"
+    )
+    localQueueDepth: int
+    workers: int
+    busyWorkers: int
+    workerUtilization: float = Field(
+        ..., description="Загрузка воркеров пода (0..1), сглаженная за 30 с"
+    )
+
+
 class ErrorResponse(BaseModel):
     errorId: str
     code: Optional[str] = None
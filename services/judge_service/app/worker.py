@@ -0,0 +1,69 @@
+from typing import Optional, Tuple
+from uuid import UUID
+
+import logging
+
+from . import crud, executor, models
+from .database import SessionLocal
+from .leases import POD_ID
+from .bundles import CourseServiceError, bundle_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _judge(submission: models.Submission) -> Tuple[str, Optional[int]]:
+    bundle = bundle_cache.get(submission.task_id)
+    if bundle is None:
+        passed, score = executor.run_python_code_against_tests(
+            submission.code, ()
+        )
+    else:
+        passed, score = executor.run_python_code_against_tests(
+            submission.code, bundle.tests, bundle.checker
+        )
+    return ("PASSED" if passed else "FAILED"), score
+
+
+def process_submission(submission_id: UUID) -> None:
+    """
+    Проверяет одну посылку из очереди: QUEUED -> RUNNING -> PASSED/FAILED/ERROR.
+    Вызывается из воркеров планировщика, поэтому открывает свою сессию.
+    Посылка должна быть арендована этим подом, иначе её не трогаем.
+
+    Взятая посылка не остаётся в RUNNING ни при какой ошибке: без
+    course_service она возвращается в очередь, при любой другой
+    ошибке получает статус ERROR.
+    """
+    db = SessionLocal()
+    try:
+        submission = crud.claim_submission(db, submission_id, POD_ID)
+        if submission is None:
+            return
+
+        try:
+            final_status, score = _judge(submission)
+        except CourseServiceError:
+            # Без тестов проверять нечего: отдаём посылку обратно,
+            # её подберёт reaper, когда course_service оживёт
+            logger.exception("Нет тестов для посылки %s", submission_id)
+            db.rollback()
+            crud.release_submission(db, submission_id, POD_ID)
+            return
+        except Exception:
+            logger.exception("Внутренняя ошибка при проверке посылки %s", submission_id)
+            db.rollback()
+            final_status, score = "ERROR", None
+
+        try:
+            crud.finish_submission(
+                db, submission, POD_ID, final_status, score
+            )
+        except Exception:
+            # Например, не обновился прогресс: вердикт важнее агрегата
+            logger.exception("Не удалось записать вердикт посылки %s", submission_id)
+            db.rollback()
+            crud.finish_submission(
+                db, submission, POD_ID, final_status, score, track_progress=False
+            )
+    finally:
+        db.close()
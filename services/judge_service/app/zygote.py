@@ -0,0 +1,241 @@
+"""
+Zygote для executor: заранее импортирует модули стандартной библиотеки
+и на каждый тест делает fork, вместо холодного старта интерпретатора.
+
+Запускается executor'ом отдельным процессом (не fork самого judge:
+там потоки, соединения с БД и чужие посылки):
+
+    python -I -S zygote.py <unix-сокет> <модули через запятую>
+
+Только стандартная библиотека — с -I каталог app/ не в sys.path.
+
+Протокол на соединение: клиент шлёт JSON {"path": ..., "cwd": ...}
+(файл решения и рабочий каталог теста) и три fd (stdin, stdout, stderr), zygote делает fork и отвечает
+"started", по завершении — {"returncode": ...} как у subprocess.
+Если клиент закрыл соединение раньше (таймаут), группа процессов
+теста убивается. EOF на stdin zygote — judge умер, выходим.
+
+Код решения zygote не читает и не кэширует: его компилирует сам
+ребёнок. Иначе решение дотянулось бы через sys._getframe() или
+gc.get_objects() до чужих посылок в памяти zygote.
+"""
+import atexit
+import builtins
+import gc
+import json
+import os
+import random
+import selectors
+import signal
+import socket
+import sys
+import traceback
+import types
+
+MAX_FDS = 3
+MAX_REQUEST_BYTES = 4096
+
+
+def _preload(names):
+    for name in names:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+
+
+def _install_exit_builtins():
+    # exit()/quit() добавляет site, а с -S его нет — решения их зовут
+    import _sitebuiltins
+
+    if not hasattr(builtins, "exit"):
+        builtins.exit = _sitebuiltins.Quitter("exit", "Ctrl-D (i.e. EOF)")
+    if not hasattr(builtins, "quit"):
+        builtins.quit = _sitebuiltins.Quitter("quit", "Ctrl-D (i.e. EOF)")
+
+
+def _exit_code(exc):
+    # Как интерпретатор трактует SystemExit
+    code = exc.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _close_inherited_fds():
+    for name in os.listdir("/proc/self/fd"):
+        fd = int(name)
+        if fd > 2:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _run_child(path, cwd, fds):
+    """
+    Дочерний процесс: свои stdin/stdout/stderr, своя группа процессов,
+    никаких fd zygote, чистый __main__. Не возвращается.
+    """
+    os.setsid()
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+    _close_inherited_fds()
+    os.chdir(cwd)
+
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.stderr = open(2, "w", closefd=False)
+    sys.argv = [path]
+    # Состояние генератора унаследовано от zygote — у каждого теста своё
+    random.seed()
+
+    main = types.ModuleType("__main__")
+    main.__file__ = path
+    main.__builtins__ = builtins
+    sys.modules["__main__"] = main
+
+    returncode = 0
+    try:
+        with open(path, "rb") as f:
+            source = f.read()
+        # Ошибка компиляции — как у python: трейсбек и код 1
+        exec(compile(source, path, "exec"), main.__dict__)
+    except SystemExit as exc:
+        returncode = _exit_code(exc)
+    except BaseException:
+        traceback.print_exc()
+        returncode = 1
+    try:
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        returncode = returncode or 120
+    os._exit(returncode)
+
+
+def _send(conn, message):
+    try:
+        conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+    except OSError:
+        pass
+
+
+def serve(sock_path, modules):
+    _preload(modules)
+    _install_exit_builtins()
+    # Всё загруженное — в постоянное поколение GC, чтобы сборщик в
+    # детях не трогал эти страницы и они оставались общими после fork
+    gc.collect()
+    gc.freeze()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(sock_path)
+    server.listen(64)
+
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ, "accept")
+    selector.register(wake_r, selectors.EVENT_READ, "reap")
+    selector.register(sys.stdin, selectors.EVENT_READ, "parent")
+
+    # pid теста -> соединение клиента (None, если клиент уже ушёл)
+    running = {}
+
+    sys.stdout.write("ready\n")
+    sys.stdout.flush()
+
+    while True:
+        for key, _ in selector.select():
+            if key.data == "accept":
+                conn, _ = server.accept()
+                try:
+                    msg, fds, _, _ = socket.recv_fds(conn, MAX_REQUEST_BYTES, MAX_FDS)
+                    request = json.loads(msg)
+                    path, cwd = request["path"], request["cwd"]
+                    if not isinstance(path, str) or not isinstance(cwd, str):
+                        raise ValueError(request)
+                except Exception:
+                    _send(conn, {"returncode": 1})
+                    conn.close()
+                    continue
+                if len(fds) != MAX_FDS:
+                    for fd in fds:
+                        os.close(fd)
+                    _send(conn, {"returncode": 1})
+                    conn.close()
+                    continue
+
+                pid = os.fork()
+                if pid == 0:
+                    try:
+                        # Кадр serve() виден ребёнку через f_back: в нём
+                        # не должно остаться ничего о других тестах
+                        running.clear()
+                        selector.close()
+                        del msg, request, conn, key
+                        _run_child(path, cwd, fds)
+                    finally:
+                        os._exit(1)
+                for fd in fds:
+                    os.close(fd)
+                running[pid] = conn
+                selector.register(conn, selectors.EVENT_READ, pid)
+                _send(conn, "started")
+
+            elif key.data == "reap":
+                try:
+                    while os.read(wake_r, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+                while True:
+                    try:
+                        pid, status = os.waitpid(-1, os.WNOHANG)
+                    except ChildProcessError:
+                        break
+                    if pid == 0:
+                        break
+                    conn = running.pop(pid, None)
+                    if conn is not None:
+                        selector.unregister(conn)
+                        _send(conn, {"returncode": os.waitstatus_to_exitcode(status)})
+                        conn.close()
+
+            elif key.data == "parent":
+                # judge закрыл наш stdin — уходим вместе с тестами
+                for pid in running:
+                    try:
+                        os.killpg(pid, signal.SIGKILL)
+                    except OSError:
+                        pass
+                return
+
+            else:
+                # Клиент закрыл соединение до конца теста: таймаут
+                pid = key.data
+                if running.get(pid) is not key.fileobj:
+                    # Тест уже завершился в этом же проходе
+                    continue
+                selector.unregister(key.fileobj)
+                key.fileobj.close()
+                running[pid] = None
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1], [name for name in sys.argv[2].split(",") if name])
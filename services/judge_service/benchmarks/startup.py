@@ -0,0 +1,77 @@
+"""
+Накладные расходы на запуск одного теста в executor: как было
+(холодный python на каждый тест), холодный python -I (sandbox.py) и
+fork из zygote с заранее импортированными модулями. Запуск из
+services/judge_service:
+
+    python -m benchmarks.startup [--tests 50] [--rounds 3]
+
+Решение импортирует типичные модули и почти ничего не считает, так
+что время на тест — это в основном старт интерпретатора.
+"""
+import argparse
+import statistics
+import time
+
+from app import executor
+from app.bundles import TestCase
+
+SOLUTION = (
+    "import sys, math, collections, itertools, heapq, bisect, re\n"
+    "n = int(input())\n"
+    "print(sum(range(n)))\n"
+)
+
+
+def make_tests(count: int):
+    return [TestCase(str(i), str(sum(range(i)))) for i in range(count)]
+
+
+def per_test_ms(tests, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        passed, _ = executor.run_python_code_against_tests(SOLUTION, tests)
+        elapsed = time.perf_counter() - started
+        if not passed:
+            raise SystemExit("решение не прошло тесты — замер бессмыслен")
+        timings.append(elapsed / len(tests) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tests", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    tests = make_tests(args.tests)
+    zygote = executor.zygote
+    if zygote is None:
+        raise SystemExit("zygote выключен (JUDGE_PRELOAD_MODULES пуст)")
+
+    results = []
+    try:
+        # Прогрев: zygote поднимается при первом тесте
+        executor.run_python_code_against_tests(SOLUTION, tests[:1])
+        flags = " ".join(executor.ZYGOTE_PYTHON_FLAGS)
+        results.append((f"zygote: fork, {flags}", per_test_ms(tests, args.rounds)))
+
+        executor.zygote = None
+        results.append(("холодный python -I", per_test_ms(tests, args.rounds)))
+
+        executor.COLD_PYTHON_FLAGS = []
+        results.append(("холодный python (было)", per_test_ms(tests, args.rounds)))
+    finally:
+        executor.zygote = zygote
+        executor.COLD_PYTHON_FLAGS = executor.SANDBOX_PYTHON_FLAGS
+        zygote.stop()
+
+    baseline = results[-1][1]
+    print(f"{args.tests} тестов, медиана из {args.rounds} прогонов")
+    for name, ms in reversed(results):
+        print(f"{name:28} {ms:7.1f} мс/тест  x{baseline / ms:4.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+#!/usr/bin/env bash
+set -e
+
+# Схема submissions — только через миграции (advisory lock в env.py
+# не даёт двум подам накатывать одновременно)
+alembic upgrade head
+
+# Помесячные партиции submissions на ближайшие месяцы
+python -m app.partitions ensure
+
+exec uvicorn app.main:app --host 0.0.0.0 --port ${APP_PORT:-8000}
@@ -0,0 +1,79 @@
+from alembic import context
+from logging.config import fileConfig
+
+from sqlalchemy import create_engine, pool
+from app.database import DATABASE_URL, Base
+from app import models  # noqa: F401  # регистрирует модели в Base.metadata
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# judge владеет только своими таблицами; tasks, test_cases и
+# user_task_progress ведёт course_service. Помесячные партиции
+# submissions_YYYY_MM создаются вне миграций (app/partitions.py).
+JUDGE_TABLES = {
+    "submissions",
+    "code_blobs",
+    "submission_idempotency_keys",
+    "submission_archive",
+}
+
+# Своя таблица версий, чтобы не пересекаться с миграциями course_service
+VERSION_TABLE = "alembic_version_judge"
+
+# Ключ advisory lock: поды, стартующие одновременно, накатывают по очереди
+MIGRATION_LOCK_KEY = 7_301_002
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    if type_ == "table":
+        return name in JUDGE_TABLES
+    # Внешние ключи на tasks есть только в БД, в моделях judge их нет
+    if type_ == "foreign_key_constraint":
+        return obj.referred_table.name in JUDGE_TABLES
+    return True
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+        version_table=VERSION_TABLE,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(DATABASE_URL, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        connection.exec_driver_sql(f"SELECT pg_advisory_lock({MIGRATION_LOCK_KEY})")
+        # Блокировка сессионная, а транзакцию, открытую запросом, alembic
+        # счёл бы внешней и не закоммитил миграции — закрываем её сразу
+        connection.commit()
+        try:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                include_object=include_object,
+                version_table=VERSION_TABLE,
+            )
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            # После ошибки транзакция прервана, unlock в ней не выполнится
+            connection.rollback()
+            connection.exec_driver_sql(f"SELECT pg_advisory_unlock({MIGRATION_LOCK_KEY})")
+            connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
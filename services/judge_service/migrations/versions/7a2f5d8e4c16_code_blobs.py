@@ -0,0 +1,53 @@
+"""content-addressed code blobs
+
+Revision ID: 7a2f5d8e4c16
+Revises: c41d7e2b9a05
+Create Date: 2026-10-19 15:00:00.000000
+"""
+
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '7a2f5d8e4c16'
+down_revision = 'c41d7e2b9a05'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "code_blobs",
+        sa.Column("hash", sa.String(length=64), primary_key=True),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    # data уже сжата zlib — повторно через pglz в TOAST не гоняем
+    op.execute("ALTER TABLE code_blobs ALTER COLUMN data SET STORAGE EXTERNAL")
+
+    op.add_column("submissions", sa.Column("code_hash", sa.String(length=64), nullable=True))
+    op.create_foreign_key("fk_submissions_code_hash", "submissions", "code_blobs", ["code_hash"], ["hash"])
+    op.create_index("ix_submissions_code_hash", "submissions", ["code_hash"])
+    # Новые посылки хранят код только в code_blobs
+    op.alter_column("submissions", "code", existing_type=sa.Text(), nullable=True)
+
+def downgrade():
+    # Возвращаем код обратно в submissions.code (zlib в SQL не распаковать)
+    conn = op.get_bind()
+    blobs = conn.execute(
+        sa.text(
+            "SELECT DISTINCT b.hash, b.data FROM code_blobs b "
+            "JOIN submissions s ON s.code_hash = b.hash WHERE s.code IS NULL"
+        )
+    )
+    for code_hash, data in blobs:
+        conn.execute(
+            sa.text("UPDATE submissions SET code = :code WHERE code_hash = :hash AND code IS NULL"),
+            {"code": zlib.decompress(data).decode("utf-8"), "hash": code_hash},
+        )
+    op.alter_column("submissions", "code", existing_type=sa.Text(), nullable=False)
+    op.drop_index("ix_submissions_code_hash", table_name="submissions")
+    op.drop_constraint("fk_submissions_code_hash", "submissions", type_="foreignkey")
+    op.drop_column("submissions", "code_hash")
+    op.drop_table("code_blobs")
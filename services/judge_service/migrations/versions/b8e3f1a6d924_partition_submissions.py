@@ -0,0 +1,156 @@
+"""partition submissions by month
+
+Revision ID: b8e3f1a6d924
+Revises: 7a2f5d8e4c16
+Create Date: 2026-10-19 16:00:00.000000
+"""
+
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'b8e3f1a6d924'
+down_revision = '7a2f5d8e4c16'
+branch_labels = None
+depends_on = None
+
+# Сколько месяцев вперёд создаём партиции сразу; дальше их ведёт
+# app/partitions.py
+PARTITIONS_AHEAD = 3
+
+COLUMNS = (
+    "id, task_id, code_hash, code, language, status, score, idempotency_key, "
+    "user_id, lease_owner, lease_expires_at, heartbeat_at, created_at, updated_at"
+)
+
+
+def _add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partition(month):
+    op.execute(
+        f"CREATE TABLE submissions_{month:%Y_%m} PARTITION OF submissions_partitioned "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') "
+        f"TO ('{_add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+    )
+
+
+def upgrade():
+    # Новая таблица рядом, копия строк, подмена. Всё в одной транзакции
+    # миграции; на время копирования запись в submissions блокирована.
+    op.execute(
+        """
+        CREATE TABLE submissions_partitioned (
+            id UUID NOT NULL,
+            task_id BIGINT NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+            code_hash VARCHAR(64) REFERENCES code_blobs(hash),
+            code TEXT,
+            language VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            score INTEGER,
+            idempotency_key VARCHAR(64),
+            user_id VARCHAR(64),
+            lease_owner VARCHAR(64),
+            lease_expires_at TIMESTAMPTZ,
+            heartbeat_at TIMESTAMPTZ,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            CONSTRAINT submissions_partitioned_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("CREATE TABLE submissions_default PARTITION OF submissions_partitioned DEFAULT")
+
+    oldest = op.get_bind().execute(
+        sa.text("SELECT min(created_at) AT TIME ZONE 'UTC' FROM submissions")
+    ).scalar()
+    current = date.today().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest is not None else current
+    while month <= _add_months(current, PARTITIONS_AHEAD):
+        _create_partition(month)
+        month = _add_months(month, 1)
+
+    op.create_table(
+        "submission_idempotency_keys",
+        sa.Column("task_id", sa.BigInteger(), primary_key=True),
+        sa.Column("idempotency_key", sa.String(length=64), primary_key=True),
+        sa.Column("submission_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("submission_created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO submission_idempotency_keys "
+        "SELECT task_id, idempotency_key, id, created_at FROM submissions "
+        "WHERE idempotency_key IS NOT NULL"
+    )
+
+    op.execute(f"INSERT INTO submissions_partitioned ({COLUMNS}) SELECT {COLUMNS} FROM submissions")
+    op.drop_table("submissions")
+    op.rename_table("submissions_partitioned", "submissions")
+    op.execute("ALTER TABLE submissions RENAME CONSTRAINT submissions_partitioned_pkey TO submissions_pkey")
+
+    # Индексы на родителе создаются и на всех партициях
+    op.create_index("ix_submissions_task_id_created_at", "submissions", ["task_id", "created_at"])
+    op.create_index("ix_submissions_code_hash", "submissions", ["code_hash"])
+    op.execute(
+        "CREATE INDEX ix_submissions_active_lease "
+        "ON submissions (lease_expires_at) "
+        "WHERE status IN ('QUEUED', 'RUNNING')"
+    )
+
+    op.create_table(
+        "submission_archive",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("task_id", sa.BigInteger(), nullable=False),
+        sa.Column("language", sa.String(length=50), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=True),
+        sa.Column("archive_file", sa.String(length=255), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade():
+    # Посылки, уже выгруженные в архив, обратно не возвращаются
+    op.drop_table("submission_archive")
+
+    op.execute(
+        """
+        CREATE TABLE submissions_plain (
+            id UUID PRIMARY KEY,
+            task_id BIGINT NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+            code_hash VARCHAR(64),
+            code TEXT,
+            language VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            score INTEGER,
+            idempotency_key VARCHAR(64),
+            user_id VARCHAR(64),
+            lease_owner VARCHAR(64),
+            lease_expires_at TIMESTAMPTZ,
+            heartbeat_at TIMESTAMPTZ,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+    op.execute(f"INSERT INTO submissions_plain ({COLUMNS}) SELECT {COLUMNS} FROM submissions")
+    op.drop_table("submission_idempotency_keys")
+    # Партиции удаляются вместе с родителем
+    op.drop_table("submissions")
+    op.rename_table("submissions_plain", "submissions")
+    op.execute("ALTER TABLE submissions RENAME CONSTRAINT submissions_plain_pkey TO submissions_pkey")
+
+    op.create_unique_constraint("uq_submissions_task_id_idem_key", "submissions", ["task_id", "idempotency_key"])
+    op.create_foreign_key("fk_submissions_code_hash", "submissions", "code_blobs", ["code_hash"], ["hash"])
+    op.create_index("ix_submissions_task_id", "submissions", ["task_id"])
+    op.create_index("ix_submissions_code_hash", "submissions", ["code_hash"])
+    op.execute(
+        "CREATE INDEX ix_submissions_active_lease "
+        "ON submissions (lease_expires_at) "
+        "WHERE status IN ('QUEUED', 'RUNNING')"
+    )
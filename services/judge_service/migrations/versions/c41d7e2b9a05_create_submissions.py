@@ -0,0 +1,57 @@
+"""create submissions
+
+Revision ID: c41d7e2b9a05
+Revises: 
+Create Date: 2026-10-19 13:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'c41d7e2b9a05'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Раньше таблицу создавал create_all на старте приложения, поэтому
+    # на существующих базах она уже есть — тогда только докатываем
+    # колонки аренды и user_id.
+    if sa.inspect(op.get_bind()).has_table("submissions"):
+        op.execute(
+            "ALTER TABLE submissions "
+            "ADD COLUMN IF NOT EXISTS user_id VARCHAR(64), "
+            "ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(64), "
+            "ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ, "
+            "ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ"
+        )
+    else:
+        op.create_table(
+            "submissions",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("task_id", sa.BigInteger(), nullable=False),
+            sa.Column("code", sa.Text(), nullable=False),
+            sa.Column("language", sa.String(length=50), nullable=False),
+            sa.Column("status", sa.String(length=20), nullable=False),
+            sa.Column("score", sa.Integer(), nullable=True),
+            sa.Column("idempotency_key", sa.String(length=64), nullable=True),
+            sa.Column("user_id", sa.String(length=64), nullable=True),
+            sa.Column("lease_owner", sa.String(length=64), nullable=True),
+            sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+            sa.ForeignKeyConstraint(["task_id"], ["tasks.id"], ondelete="CASCADE"),
+            sa.UniqueConstraint("task_id", "idempotency_key", name="uq_submissions_task_id_idem_key"),
+        )
+        op.create_index("ix_submissions_task_id", "submissions", ["task_id"])
+
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_submissions_active_lease "
+        "ON submissions (lease_expires_at) "
+        "WHERE status IN ('QUEUED', 'RUNNING')"
+    )
+
+def downgrade():
+    op.drop_table("submissions")
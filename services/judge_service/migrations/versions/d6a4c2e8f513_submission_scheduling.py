@@ -0,0 +1,26 @@
+"""submission priority and client key
+
+Revision ID: d6a4c2e8f513
+Revises: b8e3f1a6d924
+Create Date: 2026-10-19 18:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd6a4c2e8f513'
+down_revision = 'b8e3f1a6d924'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # С постоянным DEFAULT колонка добавляется без перезаписи партиций
+    op.add_column(
+        "submissions",
+        sa.Column("priority", sa.String(length=16), nullable=False, server_default="interactive"),
+    )
+    op.add_column("submissions", sa.Column("client_key", sa.String(length=80), nullable=True))
+
+def downgrade():
+    op.drop_column("submissions", "client_key")
+    op.drop_column("submissions", "priority")
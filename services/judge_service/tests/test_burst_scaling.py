@@ -0,0 +1,144 @@
+"""
+Симуляция всплеска посылок: несколько «подов» judge в одном процессе
+(свой Scheduler и LeaseKeeper у каждого) поверх общей БД и
+автоскейлер, который, как KEDA в k8s-judge-autoscaling.yaml, добавляет
+поды по глубине очереди из crud.get_queue_stats (её же отдаёт /scaling).
+
+Весь всплеск принимает один под, как при ненастроенной балансировке
+или до старта новых подов. Новые поды должны забрать накопленную
+очередь, а не ждать новых посылок.
+"""
+import math
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import text
+
+from app import crud
+from app.database import SessionLocal
+from app.leases import LeaseKeeper
+from app.scheduler import Job, Scheduler
+
+BURST = 60
+WORKERS_PER_POD = 2
+# Время проверки одной посылки, секунды
+RUN_SECONDS = 0.05
+# Шаг симуляции: heartbeat подов и опрос автоскейлера
+TICK_SECONDS = 0.05
+# Как targetValue у триггера queueDepth: под на 10 посылок в очереди
+TARGET_QUEUE_PER_POD = 10
+MAX_PODS = 4
+DEADLINE_SECONDS = 30
+
+
+class Pod:
+    def __init__(self, name: str, judged: Counter, lock: threading.Lock) -> None:
+        self.name = name
+        self._judged = judged
+        self._lock = lock
+        self.scheduler = Scheduler(self._handle, workers=WORKERS_PER_POD, max_queue_depth=BURST)
+        self.lease_keeper = LeaseKeeper(self.scheduler, owner=name)
+        self.scheduler.start()
+
+    def _handle(self, submission_id) -> None:
+        # Как worker.process_submission, только без executor'а
+        db = SessionLocal()
+        try:
+            submission = crud.claim_submission(db, submission_id, self.name)
+            if submission is None:
+                return
+            time.sleep(RUN_SECONDS)
+            crud.finish_submission(db, submission, self.name, "PASSED", 100)
+            with self._lock:
+                self._judged[self.name] += 1
+        finally:
+            db.close()
+
+    def stop(self) -> None:
+        self.scheduler.stop(timeout=5)
+        self.lease_keeper.release()
+
+
+def test_scaled_out_pods_drain_existing_backlog(db, task_id):
+    judged: Counter = Counter()
+    lock = threading.Lock()
+    pods = [Pod("pod-0", judged, lock)]
+    try:
+        # Всплеск целиком принят pod-0
+        for _ in range(BURST):
+            submission = crud.create_submission(
+                db, task_id, "print(1)", "python", "QUEUED", None, None,
+                lease_owner="pod-0", lease_seconds=30,
+            )
+            pods[0].scheduler.submit(Job(submission_id=submission.id, client_id="burst"))
+
+        started = time.monotonic()
+        timeline = []
+        while True:
+            queued, running, _ = crud.get_queue_stats(db)
+            db.rollback()
+            timeline.append((round(time.monotonic() - started, 2), len(pods), queued, running))
+            if queued == 0 and running == 0:
+                break
+            assert time.monotonic() - started < DEADLINE_SECONDS, timeline
+
+            desired = min(MAX_PODS, max(1, math.ceil(queued / TARGET_QUEUE_PER_POD)))
+            while len(pods) < desired:
+                pods.append(Pod(f"pod-{len(pods)}", judged, lock))
+            for pod in pods:
+                pod.lease_keeper.tick()
+            time.sleep(TICK_SECONDS)
+        elapsed = time.monotonic() - started
+    finally:
+        for pod in pods:
+            pod.stop()
+
+    print(f"\nвсплеск {BURST} посылок разобран за {elapsed:.2f} с: {dict(judged)}")
+    for point in timeline[:: max(1, len(timeline) // 10)]:
+        print("t=%-5s подов=%s в очереди=%-3s проверяется=%s" % point)
+
+    assert sum(judged.values()) == BURST
+    assert len(pods) == MAX_PODS
+    # Каждый добавленный под проверял посылки из очереди pod-0
+    assert all(judged[pod.name] > 0 for pod in pods[1:]), judged
+    # Один pod-0 разбирал бы очередь BURST * RUN_SECONDS / WORKERS_PER_POD
+    assert elapsed < BURST * RUN_SECONDS / WORKERS_PER_POD, timeline
+
+
+class RecordingScheduler(Scheduler):
+    """Не проверяет посылки, только запоминает, что встало в очередь."""
+
+    def __init__(self) -> None:
+        super().__init__(lambda _: None, workers=WORKERS_PER_POD, max_queue_depth=BURST)
+        self.jobs = {}
+
+    def submit(self, job: Job) -> Job:
+        self.jobs[job.submission_id] = job
+        return job
+
+
+def test_claimed_and_recovered_submissions_keep_priority_and_client(db, task_id):
+    queued = crud.create_submission(
+        db, task_id, "print(1)", "python", "QUEUED", None, None,
+        lease_owner="pod-a", lease_seconds=30,
+        priority="bulk", client_key="user:teacher",
+    )
+    orphaned = crud.create_submission(
+        db, task_id, "print(2)", "python", "RUNNING", None, None,
+        lease_owner="pod-a", lease_seconds=30,
+        priority="bulk", client_key="user:teacher",
+    )
+    # pod-a умер: аренда второй посылки истекла
+    db.execute(
+        text("UPDATE submissions SET lease_expires_at = now() - interval '1 minute' WHERE id = :id"),
+        {"id": orphaned.id},
+    )
+    db.commit()
+
+    scheduler = RecordingScheduler()
+    LeaseKeeper(scheduler, owner="pod-b").tick()
+
+    for submission in (queued, orphaned):
+        job = scheduler.jobs[submission.id]
+        assert (job.priority, job.client_id) == ("bulk", "user:teacher")
@@ -0,0 +1,92 @@
+import tempfile
+
+import pytest
+
+from app.checkers import (
+    CHECKER_OK,
+    CHECKER_WRONG_ANSWER,
+    CheckerError,
+    check_exact,
+    check_lines,
+    check_tokens,
+    make_float_checker,
+    open_checker,
+)
+from app.executor import FULL_SCORE, run_python_code_against_tests
+from app.bundles import CheckerSpec
+from app.bundles import TestCase as Case
+
+TEST = Case(input_data="2 3\n", expected_output="5\n")
+
+
+def custom(code: str) -> CheckerSpec:
+    return CheckerSpec(kind="custom", code=code)
+
+
+def test_builtin_checkers():
+    assert check_exact(TEST, "5")
+    assert not check_exact(TEST, "5 5")
+    assert check_tokens(Case("", "1  2\n3"), "1 2 3\n")
+    assert check_lines(Case("", "a\nb\na\n"), "b\na\na")
+    assert not check_lines(Case("", "a\nb\na\n"), "b\na\nb")
+
+
+@pytest.mark.parametrize("token", ["5.0000001", "5e0", "+5", "5."])
+def test_float_checker_accepts_close_numbers(token):
+    assert make_float_checker(1e-6)(TEST, token)
+
+
+@pytest.mark.parametrize("token", ["5_0", "inf", "nan", "1e999", "0x5", "５"])
+def test_float_checker_rejects_non_decimal_tokens(token):
+    assert not make_float_checker(1e-6)(Case("", "50"), token)
+
+
+def test_custom_checker_verdicts():
+    code = (
+        "import sys\n"
+        "_, expected, output = (open(p).read().split() for p in sys.argv[1:])\n"
+        f"sys.exit({CHECKER_OK} if expected == output else {CHECKER_WRONG_ANSWER})\n"
+    )
+    with open_checker(custom(code)) as check:
+        assert check(TEST, "5\n")
+        assert not check(TEST, "6\n")
+
+
+@pytest.mark.parametrize("code", ["", "  \n", None])
+def test_blank_custom_checker_is_an_error(code):
+    with pytest.raises(CheckerError):
+        with open_checker(custom(code)):
+            pass
+
+
+@pytest.mark.parametrize("code", ["pass", "raise ValueError", "import sys; sys.exit(1)"])
+def test_checker_without_verdict_is_an_error(code):
+    with open_checker(custom(code)) as check:
+        with pytest.raises(CheckerError):
+            check(TEST, "5\n")
+
+
+def test_custom_checker_runs_without_judge_environment(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql://secret")
+    code = (
+        "import os, sys\n"
+        f"sys.exit({CHECKER_WRONG_ANSWER} if 'DATABASE_URL' in os.environ else {CHECKER_OK})\n"
+    )
+    with open_checker(custom(code)) as check:
+        assert check(TEST, "5\n")
+
+
+def test_solution_cannot_see_checker_files():
+    # Со второго теста на диске лежали бы файлы чекера прошлого теста
+    peek = (
+        "import glob, os\n"
+        f"found = glob.glob(os.path.join({tempfile.gettempdir()!r}, 'checker-*', '*'))\n"
+        "print('leak' if found or os.listdir('.') else 'clean')\n"
+    )
+    checker = custom(
+        "import sys\n"
+        "output = open(sys.argv[3]).read().split()\n"
+        f"sys.exit({CHECKER_OK} if output == ['clean'] else {CHECKER_WRONG_ANSWER})\n"
+    )
+    tests = [Case(str(i), "clean") for i in range(3)]
+    assert run_python_code_against_tests(peek, tests, checker) == (True, FULL_SCORE)
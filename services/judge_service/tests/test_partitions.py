@@ -0,0 +1,91 @@
+import gzip
+from datetime import date, datetime, timezone
+
+import orjson
+from sqlalchemy import text
+
+from app import crud, models
+from app.partitions import (
+    add_months,
+    archive_partitions,
+    collect_code_blobs,
+    create_partition,
+    ensure_partitions,
+    month_start,
+    partition_name,
+)
+
+
+def _submit(db, task_id, code, created_at=None):
+    submission_id = crud.create_submission(
+        db, task_id, code, "python", "PASSED", 100, None
+    ).id
+    if created_at is not None:
+        # Партиционирование по created_at: строка переезжает в партицию месяца
+        db.execute(
+            text("UPDATE submissions SET created_at = :at WHERE id = :id"),
+            {"at": created_at, "id": submission_id},
+        )
+        db.commit()
+    return submission_id
+
+
+def test_archive_keeps_code_and_collects_unused_blobs(db, task_id, tmp_path):
+    old_month = add_months(month_start(date.today()), -12)
+    old_at = datetime(old_month.year, old_month.month, 15, tzinfo=timezone.utc)
+    create_partition(db, old_month)
+    db.commit()
+    try:
+        archived_id = _submit(db, task_id, "print('only archived')", old_at)
+        shared_id = _submit(db, task_id, "print('shared')", old_at)
+        _submit(db, task_id, "print('shared')")
+
+        assert partition_name(old_month) in archive_partitions(db, 6, str(tmp_path))
+    finally:
+        db.rollback()
+        db.execute(text(f"DROP TABLE IF EXISTS {partition_name(old_month)}"))
+        db.commit()
+
+    with gzip.open(tmp_path / f"{partition_name(old_month)}.jsonl.gz") as f:
+        rows = {row["id"]: row for row in map(orjson.loads, f)}
+    assert rows[str(archived_id)]["code"] == "print('only archived')"
+    assert rows[str(shared_id)]["code"] == "print('shared')"
+
+    assert collect_code_blobs(db) >= 1
+    remaining = {blob.code for blob in db.query(models.CodeBlob)}
+    assert "print('only archived')" not in remaining
+    # На этот код ещё ссылается живая посылка
+    assert "print('shared')" in remaining
+
+    db.execute(text("DELETE FROM submission_archive WHERE task_id = :id"), {"id": task_id})
+    db.commit()
+
+
+def test_rows_in_default_partition_get_their_month_and_are_archived(db, task_id, tmp_path):
+    # Месяца нет среди партиций: строка ляжет в submissions_default
+    old_month = add_months(month_start(date.today()), -24)
+    old_at = datetime(old_month.year, old_month.month, 3, tzinfo=timezone.utc)
+    name = partition_name(old_month)
+    try:
+        submission_id = _submit(db, task_id, "print('default')", old_at)
+        assert db.execute(
+            text("SELECT count(*) FROM submissions_default WHERE id = :id"), {"id": submission_id}
+        ).scalar_one() == 1
+        db.rollback()
+
+        assert name in ensure_partitions(db)
+        assert db.execute(
+            text(f"SELECT count(*) FROM {name} WHERE id = :id"), {"id": submission_id}
+        ).scalar_one() == 1
+        db.rollback()
+
+        assert name in archive_partitions(db, 6, str(tmp_path))
+    finally:
+        db.rollback()
+        db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        db.commit()
+
+    with gzip.open(tmp_path / f"{name}.jsonl.gz") as f:
+        assert [row["id"] for row in map(orjson.loads, f)] == [str(submission_id)]
+    db.execute(text("DELETE FROM submission_archive WHERE task_id = :id"), {"id": task_id})
+    db.commit()
@@ -0,0 +1,177 @@
+"""
+Допуск и очередь планировщика (app/scheduler.py) — без БД: обработчик
+посылки только записывает порядок.
+"""
+import threading
+import time
+from uuid import uuid4
+
+import pytest
+from starlette.requests import Request
+
+from app import scheduler as scheduler_module
+from app.main import client_id_from_request, client_ip_from_request
+from app.scheduler import Job, RateLimiter, Scheduler, TokenBucket
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=2.0, capacity=2.0, now=100.0)
+    bucket.take()
+    bucket.take()
+    assert bucket.wait_time(100.0) == pytest.approx(0.5)
+    assert bucket.wait_time(100.25) == pytest.approx(0.25)
+    assert bucket.wait_time(100.5) == 0.0
+    # Дольше простой — не больше capacity жетонов
+    bucket.wait_time(1000.0)
+    assert bucket.tokens == 2.0
+
+
+def test_rate_limiter_evicts_least_recently_used():
+    limiter = RateLimiter(rate=1.0, burst=1.0, max_keys=2)
+    a = limiter.bucket("a", 0.0)
+    limiter.bucket("b", 0.0)
+    assert limiter.bucket("a", 0.0) is a
+    limiter.bucket("c", 0.0)
+    assert limiter.bucket("a", 0.0) is a
+    # b вытеснен — у нового бакета снова полный запас
+    b = limiter.bucket("b", 0.0)
+    assert b.tokens == 1.0
+
+
+class Recorder:
+    """Scheduler с одним воркером, который можно придержать."""
+
+    def __init__(self, **kwargs) -> None:
+        self.order = []
+        self.release = threading.Event()
+        self.scheduler = Scheduler(self._handle, workers=1, **kwargs)
+        self.labels = {}
+
+    def _handle(self, submission_id) -> None:
+        self.release.wait(5)
+        self.order.append(self.labels[submission_id])
+
+    def submit(self, label: str, client_id: str, priority: str = "interactive") -> Job:
+        job = Job(submission_id=uuid4(), client_id=client_id, priority=priority)
+        self.labels[job.submission_id] = label
+        return self.scheduler.submit(job)
+
+    def hold_worker(self) -> Job:
+        # Воркер занят, пока тест ставит посылки в очередь
+        job = self.submit("hold", "holder")
+        self.scheduler.start()
+        while self.scheduler.depth:
+            time.sleep(0.001)
+        return job
+
+    def drain(self, last: Job) -> list:
+        self.release.set()
+        assert last.done.wait(5)
+        self.scheduler.stop(timeout=5)
+        return self.order[1:]
+
+
+def test_interactive_is_served_four_times_as_often_as_bulk():
+    recorder = Recorder()
+    recorder.hold_worker()
+    for _ in range(4):
+        recorder.submit("bulk", "teacher", "bulk")
+    for _ in range(7):
+        last = recorder.submit("interactive", "student", "interactive")
+    order = recorder.drain(last)
+    # Окончания: interactive через 1/4, bulk через 1
+    assert order == ["interactive"] * 3 + ["bulk"] + ["interactive"] * 4 + ["bulk"] * 3
+
+
+def test_one_client_does_not_delay_another():
+    recorder = Recorder()
+    recorder.hold_worker()
+    for i in range(10):
+        recorder.submit(f"a{i}", "a")
+    last = recorder.submit("b0", "b")
+    order = recorder.drain(last)
+    assert order.index("b0") <= 1
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "CLIENT_RATE", 0.5)
+    monkeypatch.setattr(scheduler_module, "CLIENT_BURST", 2)
+    monkeypatch.setattr(scheduler_module, "TASK_RATE", 100)
+    monkeypatch.setattr(scheduler_module, "TASK_BURST", 100)
+    monkeypatch.setattr(scheduler_module, "NETWORK_RATE", 1)
+    monkeypatch.setattr(scheduler_module, "NETWORK_BURST", 3)
+
+
+def test_admit_returns_retry_after_when_client_is_over_limit(limits):
+    scheduler = Scheduler(lambda _: None, workers=1)
+    scheduler.start()
+    try:
+        assert scheduler.admit("user:a", 1) == 0
+        assert scheduler.admit("user:a", 1) == 0
+        # Жетон появится через 1 / CLIENT_RATE
+        assert scheduler.admit("user:a", 1) == pytest.approx(2.0, abs=0.05)
+        assert scheduler.admit("user:b", 1) == 0
+    finally:
+        scheduler.stop(timeout=5)
+
+
+def test_network_limit_caps_all_users_behind_one_ip(limits):
+    scheduler = Scheduler(lambda _: None, workers=1)
+    scheduler.start()
+    try:
+        for i in range(3):
+            assert scheduler.admit(f"user:{i}", 1, network_id="10.0.0.1") == 0
+        assert scheduler.admit("user:forged", 1, network_id="10.0.0.1") > 0
+        assert scheduler.admit("user:forged", 1, network_id="10.0.0.2") == 0
+    finally:
+        scheduler.stop(timeout=5)
+
+
+def test_admit_rejects_when_queue_is_full():
+    recorder = Recorder(max_queue_depth=1)
+    assert recorder.scheduler.admit("a", 1) >= 1.0  # не запущен
+    recorder.hold_worker()
+    last = recorder.submit("queued", "a")
+    assert recorder.scheduler.admit("b", 1) >= 1.0
+    recorder.drain(last)
+
+
+def make_request(headers, client=("203.0.113.7", 50000)):
+    raw = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "headers": raw, "client": client})
+
+
+def test_client_id_prefers_user_id():
+    request = make_request({"X-Real-IP": "198.51.100.1"})
+    assert client_id_from_request(request, "student-1") == "user:student-1"
+    assert client_id_from_request(request, None) == "ip:198.51.100.1"
+
+
+def test_client_ip_uses_only_gateway_headers():
+    assert client_ip_from_request(make_request({"X-Forwarded-For": "1.1.1.1, 198.51.100.2"})) == "198.51.100.2"
+    assert client_ip_from_request(make_request({})) == "203.0.113.7"
+
+
+def test_post_returns_429_with_retry_after(db, task_id, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    admitted = []
+
+    def admit(client_id, task, network_id=None):
+        admitted.append((client_id, network_id))
+        return 2.3
+
+    monkeypatch.setattr(main, "require_task", lambda task: None)
+    monkeypatch.setattr(main.scheduler, "admit", admit)
+    response = TestClient(main.app).post(
+        f"/tasks/{task_id}/submissions",
+        json={"code": "print(1)", "language": "python"},
+        headers={"X-Idempotency-Key": str(uuid4()), "X-User-Id": "s1", "X-Real-IP": "198.51.100.9"},
+    )
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+    assert response.json()["code"] == "TOO_MANY_REQUESTS"
+    assert admitted == [("user:s1", "198.51.100.9")]
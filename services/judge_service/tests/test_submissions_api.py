@@ -0,0 +1,20 @@
+"""
+Формат ответов GET /tasks/{id}/submissions и GET /submissions/{id}.
+"""
+from fastapi.testclient import TestClient
+
+from app import crud, main
+
+
+def test_list_item_matches_single_get(db, task_id, monkeypatch):
+    # Задача есть — course_service в тесте не нужен
+    monkeypatch.setattr(main, "require_task", lambda task: None)
+    submission = crud.create_submission(db, task_id, "print(1)", "python", "PASSED", 100, None)
+    client = TestClient(main.app)
+
+    listed = client.get(f"/tasks/{task_id}/submissions")
+    single = client.get(f"/submissions/{submission.id}")
+
+    assert listed.status_code == single.status_code == 200
+    assert listed.json() == [single.json()]
+    assert single.json()["createdAt"].endswith("Z")
@@ -0,0 +1,49 @@
+"""
+Контекст трассы из X-Request-Id (app/tracing.py; та же копия — в
+course_service/app/core/tracing.py).
+"""
+import hashlib
+
+from opentelemetry import trace
+from opentelemetry.propagators.composite import CompositePropagator
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+from app.tracing import RequestIdPropagator
+
+NGINX_REQUEST_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+def parent(carrier, propagator=RequestIdPropagator()):
+    return trace.get_current_span(propagator.extract(carrier)).get_span_context()
+
+
+def test_nginx_request_id_is_the_trace_id():
+    context = parent({"x-request-id": NGINX_REQUEST_ID})
+    assert context.trace_id == int(NGINX_REQUEST_ID, 16)
+    assert context.is_remote
+    assert context.trace_flags.sampled
+    # Регистр и пробелы не меняют трассу
+    assert parent({"x-request-id": f" {NGINX_REQUEST_ID.upper()} "}).trace_id == context.trace_id
+
+
+def test_other_request_ids_are_hashed():
+    context = parent({"x-request-id": "client-req-42"})
+    digest = hashlib.sha256(b"client-req-42").hexdigest()
+    assert context.trace_id == int(digest[:32], 16)
+    assert context.span_id == int(digest[32:48], 16)
+    # Один и тот же id — одна трасса во всех сервисах
+    assert parent({"x-request-id": "client-req-42"}) == context
+
+
+def test_without_request_id_there_is_no_parent():
+    assert not parent({}).is_valid
+    assert not parent({"x-request-id": ""}).is_valid
+
+
+def test_traceparent_wins_over_request_id():
+    propagator = CompositePropagator([RequestIdPropagator(), TraceContextTextMapPropagator()])
+    carrier = {
+        "x-request-id": NGINX_REQUEST_ID,
+        "traceparent": "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01",
+    }
+    assert parent(carrier, propagator).trace_id == 0x0AF7651916CD43DD8448EB211C80319C
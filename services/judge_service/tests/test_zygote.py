@@ -0,0 +1,102 @@
+"""
+Zygote executor'а (app/zygote.py) без judge: только стандартная
+библиотека, запускается так же, как его запускает executor.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ZYGOTE_SCRIPT = Path(__file__).resolve().parent.parent / "app" / "zygote.py"
+
+SECRET = "secret" + "-of-another-student"
+
+PEEK = '''
+import gc
+import sys
+import types
+
+marker = "secret" + "-of-"
+
+
+def leaks(value):
+    return isinstance(value, str) and marker in value and value != marker
+
+
+found = []
+frame = sys._getframe().f_back
+while frame is not None:
+    if any(leaks(repr(value)) for value in frame.f_locals.values()):
+        found.append(frame.f_code.co_name)
+    frame = frame.f_back
+for obj in gc.get_objects():
+    if isinstance(obj, types.CodeType):
+        values = obj.co_consts
+    elif isinstance(obj, dict):
+        values = obj.values()
+    elif isinstance(obj, (list, tuple)):
+        values = obj
+    else:
+        continue
+    if any(leaks(value) for value in values):
+        found.append(type(obj).__name__)
+print("FOUND" if found else "CLEAN", found)
+'''
+
+
+@pytest.fixture
+def zygote(tmp_path):
+    sock_path = str(tmp_path / "zygote.sock")
+    proc = subprocess.Popen(
+        [sys.executable, "-I", "-S", str(ZYGOTE_SCRIPT), sock_path, "math,collections"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        cwd=str(tmp_path),
+    )
+    assert proc.stdout.readline() == b"ready\n"
+    yield sock_path
+    proc.stdin.close()
+    proc.wait(timeout=5)
+
+
+def run(sock_path, code, stdin=""):
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "solution.py")
+    with open(path, "w") as f:
+        f.write(code)
+    with tempfile.TemporaryFile() as inp, tempfile.TemporaryFile() as out:
+        inp.write(stdin.encode("utf-8"))
+        inp.seek(0)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.connect(sock_path)
+            fds = [inp.fileno(), out.fileno(), out.fileno()]
+            socket.send_fds(conn, [json.dumps({"path": path, "cwd": workdir}).encode("utf-8")], fds)
+            reader = conn.makefile("rb")
+            assert json.loads(reader.readline()) == "started"
+            returncode = json.loads(reader.readline())["returncode"]
+        out.seek(0)
+        return returncode, out.read().decode("utf-8")
+
+
+def test_runs_solution_with_stdin(zygote):
+    assert run(zygote, "print(sum(map(int, input().split())))", "2 3\n") == (0, "5\n")
+
+
+def test_exit_codes_match_python(zygote):
+    assert run(zygote, "exit(3)")[0] == 3
+    assert run(zygote, "raise ValueError")[0] == 1
+    returncode, output = run(zygote, "def f(:\n")
+    assert returncode == 1
+    assert "SyntaxError" in output
+
+
+def test_child_cannot_see_other_submissions(zygote):
+    assert run(zygote, f"SECRET = {SECRET!r}\nprint(len(SECRET))") == (0, f"{len(SECRET)}\n")
+    returncode, output = run(zygote, PEEK)
+    assert returncode == 0
+    assert output.startswith("CLEAN"), output